@@ -5,15 +5,17 @@ from distutils.version import LooseVersion
 import param
 __version__ = str(param.version.Version(fpath=__file__, archive_commit="$Format:%h$",reponame="datashader"))
 
-from .core import Canvas                                 # noqa (API import)
+from .core import Canvas, Accumulator, AggregateCache, precompile  # noqa (API import)
 from .reductions import *                                # noqa (API import)
 from .glyphs import Point                                # noqa (API import)
 from .pipeline import Pipeline                           # noqa (API import)
+from .streaming import StreamingCanvas                   # noqa (API import)
 from . import transfer_functions as tf                   # noqa (API import)
 
 from . import pandas                         # noqa (build backend dispatch)
 try:
     from . import dask                       # noqa (build backend dispatch)
+    from . import xarray                     # noqa (build backend dispatch)
 except ImportError:
     pass
 
@@ -1,8 +1,16 @@
 from __future__ import absolute_import, division, print_function
 
+import hashlib
+import inspect
+import marshal
+import os
+import sys
+import textwrap
+import types
 from itertools import count
 
 from toolz import unique, concat, pluck, get, memoize
+import numba as nb
 import numpy as np
 import xarray as xr
 
@@ -15,6 +23,14 @@ from .utils import ngjit
 __all__ = ['compile_components']
 
 
+#: Directory in which generated append kernels, and the extend kernels of
+#: the glyphs built on them, are written, so that numba can cache their
+#: machine code on disk and reuse it in other processes.
+#: Defaults to the ``DATASHADER_KERNEL_CACHE_DIR`` environment variable;
+#: ``None`` disables the on-disk cache.
+kernel_cache_dir = os.environ.get('DATASHADER_KERNEL_CACHE_DIR')
+
+
 @memoize
 def compile_components(agg, schema, glyph):
     """Given a ``Aggregation`` object and a schema, return 5 sub-functions.
@@ -122,8 +138,116 @@ def make_append(bases, cols, calls, glyph):
     else:
         code = ('def append(i, x, y, {0}):\n'
                 '    {1}').format(', '.join(signature), '\n    '.join(body))
-    _exec(code, namespace)
-    return ngjit(namespace['append'])
+    return compile_kernel(code, namespace, 'append')
+
+
+def compile_kernel(code, namespace, name):
+    """Compile the function ``name`` defined by generated source ``code``.
+
+    Functions defined with ``exec`` have no source file, so numba cannot
+    cache them. If ``kernel_cache_dir`` is set, the source is instead written
+    to a content-addressed module in that directory and jitted with
+    ``cache=True``, so the compiled kernel is loaded from disk by any later
+    process generating the same source.
+    """
+    key = _kernel_key(code, namespace) if kernel_cache_dir else None
+    if key is None:
+        _exec(code, namespace)
+        return ngjit(namespace[name])
+
+    modname = 'datashader_kernel_' + key
+    module = sys.modules.get(modname)
+    if module is None:
+        path = os.path.join(kernel_cache_dir, modname + '.py')
+        if not os.path.exists(path):
+            _write_kernel_source(path, code)
+        module = types.ModuleType(modname)
+        module.__file__ = path
+        module.__dict__.update(namespace)
+        _exec(compile(code, path, 'exec'), module.__dict__)
+        # numba pickles references to the kernel by module and name
+        sys.modules[modname] = module
+    return nb.jit(nopython=True, nogil=True, cache=True)(getattr(module, name))
+
+
+def compile_closure(func):
+    """Compile the kernel ``func``, a function nested in a kernel builder,
+    like ``ngjit``.
+
+    Numba cannot cache closures, so if ``kernel_cache_dir`` is set, the
+    source of ``func`` is compiled by ``compile_kernel`` as a module-level
+    function instead, with the variables it closes over (typically the
+    kernels built before it) and the globals it uses as module globals.
+    """
+    if kernel_cache_dir is None:
+        return ngjit(func)
+    try:
+        cells = [c.cell_contents for c in func.__closure__ or ()]
+        source = textwrap.dedent(inspect.getsource(func))
+    except (ValueError, IOError, TypeError):
+        # A variable assigned after the definition, or no source
+        return ngjit(func)
+    namespace = dict((k, func.__globals__[k])
+                     for k in _global_names(func.__code__)
+                     if k in func.__globals__)
+    namespace.update(zip(func.__code__.co_freevars, cells))
+    # Drop the decorators
+    code = source[source.index('def '):]
+    return compile_kernel(code, namespace, func.__name__)
+
+
+def _global_names(code):
+    """The names used by ``code`` and the functions nested in it"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.update(_global_names(const))
+    return names
+
+
+def _kernel_key(code, namespace):
+    """Return a hash identifying ``code`` and the functions it calls.
+
+    Returns None if an object in ``namespace`` cannot be identified by its
+    name or bytecode alone (e.g. a closure, or a function not defined in a
+    module), in which case it cannot be cached. Kernels compiled from a
+    cached module are identified by that module, named after its own key.
+    """
+    h = hashlib.sha1(code.encode('utf-8'))
+    h.update(nb.__version__.encode('utf-8'))
+    for k in sorted(namespace):
+        value = namespace[k]
+        h.update(k.encode('utf-8'))
+        if isinstance(value, types.ModuleType):
+            h.update(value.__name__.encode('utf-8'))
+            continue
+        if value is None or isinstance(value, (bool, int, float)):
+            h.update(repr(value).encode('utf-8'))
+            continue
+        func = getattr(value, 'py_func', None)
+        if (func is None or func.__closure__ is not None or
+                func.__module__ not in sys.modules):
+            return None
+        h.update(func.__module__.encode('utf-8'))
+        h.update(marshal.dumps(func.__code__))
+    return h.hexdigest()
+
+
+def _write_kernel_source(path, code):
+    try:
+        os.makedirs(kernel_cache_dir)
+    except OSError:
+        if not os.path.isdir(kernel_cache_dir):
+            raise
+    # Write to a temporary file first so concurrent workers never see a
+    # partially written module
+    tmp = '{0}.{1}.tmp'.format(path, os.getpid())
+    with open(tmp, 'w') as f:
+        f.write(code)
+    try:
+        os.rename(tmp, path)
+    except OSError:
+        os.remove(tmp)
 
 
 def make_combine(bases, dshapes, temps):
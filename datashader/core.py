@@ -1,11 +1,15 @@
 from __future__ import absolute_import, division, print_function
 
+import weakref
 from numbers import Number
+from timeit import default_timer
 
 import numpy as np
 import pandas as pd
 import dask.dataframe as dd
 from dask.array import Array
+from dask.dataframe.utils import has_known_categories
+from pandas.api.types import is_categorical_dtype
 from six import string_types
 from xarray import DataArray, Dataset
 from collections import OrderedDict
@@ -13,7 +17,9 @@ from collections import OrderedDict
 from datashader.spatial.points import SpatialPointsFrame
 from .utils import Dispatcher, ngjit, calc_res, calc_bbox, orient_array, compute_coords
 from .utils import get_indices, dshape_from_pandas, dshape_from_dask
+from .utils import ArrayColumns, dshape_from_xarray_dataset
 from .utils import Expr # noqa (API import)
+from .compiler import compile_components
 from .resampling import resample_2d
 from . import reductions as rd
 
@@ -135,28 +141,52 @@ class Canvas(object):
     x_axis_type, y_axis_type : str, optional
         The type of the axis. Valid options are ``'linear'`` [default], and
         ``'log'``.
+    threads : int, optional
+        Number of threads used to aggregate in-memory (pandas) sources.
+        The rows are split into ``threads`` chunks that are aggregated in
+        parallel and then combined. Default is 1 (single threaded).
+    cache : AggregateCache, optional
+        If provided, aggregates computed on this canvas are looked up in and
+        stored into ``cache``, so that repeated (or derivable) views are
+        served without aggregating the data again.
+    lazy : bool, optional
+        If True, aggregating a dask DataFrame returns an aggregate backed by
+        dask arrays, without computing it, so that several aggregates and
+        any further processing of them can be computed together (e.g. in
+        one ``dask.compute`` call). The ranges of the canvas should be set,
+        as auto-ranging still computes the extents of the data. Default is
+        False.
     """
     def __init__(self, plot_width=600, plot_height=600,
                  x_range=None, y_range=None,
-                 x_axis_type='linear', y_axis_type='linear'):
+                 x_axis_type='linear', y_axis_type='linear', threads=1,
+                 cache=None, lazy=False):
         self.plot_width = plot_width
         self.plot_height = plot_height
         self.x_range = None if x_range is None else tuple(x_range)
         self.y_range = None if y_range is None else tuple(y_range)
         self.x_axis = _axis_lookup[x_axis_type]
         self.y_axis = _axis_lookup[y_axis_type]
+        self.threads = threads
+        self.cache = cache
+        self.lazy = lazy
 
-    def points(self, source, x, y, agg=None):
+    def points(self, source, x, y, agg=None, x_sorted=False):
         """Compute a reduction by pixel, mapping data to pixels as points.
 
         Parameters
         ----------
         source : pandas.DataFrame, dask.DataFrame, or xarray.DataArray/Dataset
-            The input datasource.
+            The input datasource. A dict of 1D arrays or a NumPy structured
+            array may also be used, and is aggregated without copying.
         x, y : str
             Column names for the x and y coordinates of each point.
         agg : Reduction, optional
             Reduction to compute. Default is ``count()``.
+        x_sorted : bool, optional
+            Whether the ``x`` column is sorted in ascending order (e.g. a
+            time series). If so, only the rows within ``x_range`` are found
+            by binary search and aggregated, instead of scanning every row.
         """
         from .glyphs import Point
         from .reductions import count as count_rdn
@@ -171,9 +201,119 @@ class Canvas(object):
             source = source.spatial_query(
                 x_range=self.x_range, y_range=self.y_range)
 
-        return bypixel(source, self, Point(x, y), agg)
+        return bypixel(source, self, Point(x, y, x_sorted), agg)
+
+    def multi(self, source, x, y, agg=None, views=()):
+        """Aggregate points onto this canvas and onto several other canvases
+        (views) in a single pass over the data.
+
+        Equivalent to calling ``points`` on every canvas, but the data are
+        only scanned once: each row is appended to all the aggregates it
+        falls into. Useful to render e.g. an overview and detail views of
+        the same large dataset.
+
+        Parameters
+        ----------
+        source : pandas.DataFrame, dask.DataFrame, or xarray.DataArray/Dataset
+            The input datasource. A dict of 1D arrays or a NumPy structured
+            array may also be used, and is aggregated without copying.
+        x, y : str
+            Column names for the x and y coordinates of each point.
+        agg : Reduction, optional
+            Reduction to compute. Default is ``count()``.
+        views : list of Canvas, optional
+            Other canvases to aggregate onto, which may have different ranges
+            and resolutions, but must have the same axis types as this one.
+            Unset ranges default to the bounds of the data.
 
-    def line(self, source, x, y, agg=None, axis=0):
+        Returns
+        -------
+        aggregates : list of xarray.DataArray or xarray.Dataset
+            The aggregate on this canvas, followed by one for every view.
+        """
+        from .glyphs import Point
+        from .reductions import count as count_rdn
+        if agg is None:
+            agg = count_rdn()
+
+        canvases = [self] + list(views)
+        for canvas in canvases:
+            if (type(canvas.x_axis) is not type(self.x_axis) or
+                    type(canvas.y_axis) is not type(self.y_axis)):
+                raise ValueError('All views must have the same axis types')
+            canvas.validate()
+
+        glyph = Point(x, y)
+        source, schema = _prepare_source(source, glyph, agg)
+        with np.warnings.catch_warnings():
+            np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
+            return bypixel.multi(source, schema, canvases, glyph, agg)
+
+    def pyramid(self, source, glyph, agg=None, levels=2):
+        """Compute a pyramid of aggregates from a single pass over the data.
+
+        The data are aggregated once, at the resolution of this canvas. Every
+        coarser level has half the width and height of the previous one, and
+        is derived exactly from its base arrays by combining each 2x2 block
+        of pixels, as partitions are combined (e.g. counts and sums are
+        added, and the variance terms of ``var`` and ``std`` are merged).
+
+        Parameters
+        ----------
+        source : pandas.DataFrame, dask.DataFrame, xarray.DataArray/Dataset,
+                 dict of arrays, or structured array
+            The input datasource.
+        glyph : Glyph
+            The glyph mapping data to pixels, e.g. ``Point('x', 'y')``.
+        agg : Reduction, optional
+            Reduction to compute. Default is ``count()``.
+        levels : int, optional
+            Number of levels, including the full resolution one. The plot
+            width and height must be divisible by ``2 ** (levels - 1)``.
+
+        Returns
+        -------
+        aggregates : list of xarray.DataArray or xarray.Dataset
+            One aggregate per level, from the finest to the coarsest.
+        """
+        from .reductions import count as count_rdn
+        if agg is None:
+            agg = count_rdn()
+        if self.x_range is None or self.y_range is None:
+            raise ValueError('pyramid requires a canvas with both x_range and '
+                             'y_range set')
+        if not isinstance(levels, int) or levels < 1:
+            raise ValueError('levels must be an integer >= 1')
+        factor = 2 ** (levels - 1)
+        if self.plot_width % factor or self.plot_height % factor:
+            raise ValueError('plot_width and plot_height must be divisible '
+                             'by 2 ** (levels - 1) = {0}'.format(factor))
+        self.validate()
+
+        source, schema = _prepare_source(source, glyph, agg)
+        _, _, _, combine, finalize = compile_components(agg, schema, glyph)
+        width, height = self.plot_width, self.plot_height
+        aggs = []
+        with np.warnings.catch_warnings():
+            np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
+            bases = bypixel.extend(source, schema, self, glyph, agg, None)
+            for level in range(levels):
+                if level:
+                    bases = _coarsen_bases(bases, combine)
+                    width, height = width // 2, height // 2
+                x_st = self.x_axis.compute_scale_and_translate(self.x_range,
+                                                               width)
+                y_st = self.y_axis.compute_scale_and_translate(self.y_range,
+                                                               height)
+                coords = [self.y_axis.compute_index(y_st, height),
+                          self.x_axis.compute_index(x_st, width)]
+                # finalize may reuse the bases, which the next level needs
+                aggs.append(finalize(tuple(b.copy() for b in bases),
+                                     coords=coords,
+                                     dims=[glyph.y_label, glyph.x_label]))
+        return aggs
+
+    def line(self, source, x, y, agg=None, axis=0, x_sorted=False):
         """Compute a reduction by pixel, mapping data to pixels as one or
         more lines.
 
@@ -189,7 +329,8 @@ class Canvas(object):
         Parameters
         ----------
         source : pandas.DataFrame, dask.DataFrame, or xarray.DataArray/Dataset
-            The input datasource.
+            The input datasource. A dict of 1D arrays or a NumPy structured
+            array may also be used, and is aggregated without copying.
         x, y : str or number or list or tuple or np.ndarray
             Specification of the x and y coordinates of each vertex
             * str or number: Column labels in source
@@ -204,6 +345,15 @@ class Canvas(object):
                  all rows in source
             * 1: Draw one line per row in source using data from the
                  specified columns
+        x_sorted : bool, optional
+            Whether the ``x`` column is sorted in ascending order (e.g. a
+            time series). If so, only the vertices within ``x_range`` (and
+            their outer neighbours) are found by binary search and
+            aggregated, instead of scanning every row. Only supported for a
+            single line with ``axis=0``. With the default ``any()``
+            reduction, the vertices within each pixel column are also
+            reduced to the first, last, lowest and highest ones before
+            drawing, which leaves the result unchanged.
 
         Examples
         --------
@@ -281,7 +431,9 @@ class Canvas(object):
         if axis == 0:
             if (isinstance(x, (Number, string_types)) and
                     isinstance(y, (Number, string_types))):
-                glyph = LineAxis0(x, y)
+                decimate = (x_sorted and type(agg) is any_rdn and
+                            agg.column is None)
+                glyph = LineAxis0(x, y, x_sorted, decimate)
             elif (isinstance(x, (list, tuple)) and
                     isinstance(y, (list, tuple))):
                 glyph = LineAxis0Multi(tuple(x), tuple(y))
@@ -326,6 +478,9 @@ See docstring for more information on valid usage""".format(
 The axis argument to Canvas.line must be 0 or 1
     Received: {axis}""".format(axis=axis))
 
+        if x_sorted and not isinstance(glyph, LineAxis0):
+            raise ValueError('x_sorted is only supported for a single line '
+                             'with axis=0')
         return bypixel(source, self, glyph, agg)
 
 
@@ -630,6 +785,8 @@ The axis argument to Canvas.line must be 0 or 1
         """Check that parameter settings are valid for this object"""
         self.x_axis.validate(self.x_range)
         self.y_axis.validate(self.y_range)
+        if not isinstance(self.threads, int) or self.threads < 1:
+            raise ValueError('threads must be an integer >= 1')
 
 
 def bypixel(source, canvas, glyph, agg):
@@ -641,44 +798,103 @@ def bypixel(source, canvas, glyph, agg):
 
     Parameters
     ----------
-    source : pandas.DataFrame, dask.DataFrame
+    source : pandas.DataFrame, dask.DataFrame, dict of arrays, structured array
         Input datasource
     canvas : Canvas
     glyph : Glyph
     agg : Reduction
     """
+    cache = canvas.cache if not canvas.lazy else None
+    # Identify the data as given, before it is normalized into a new object
+    token = cache._token(source) if cache is not None else None
+    source, schema = _prepare_source(source, glyph, agg)
+    canvas.validate()
+
+    # All-NaN objects (e.g. chunks of arrays with no data) are valid in Datashader
+    with np.warnings.catch_warnings():
+        np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
+        if cache is not None:
+            return cache.aggregate(source, schema, canvas, glyph, agg, token)
+        return bypixel.pipeline(source, schema, canvas, glyph, agg)
+
+
+def _prepare_source(source, glyph, agg):
+    """Normalize ``source`` to a pandas or dask DataFrame, an ``ArrayColumns``
+    or (for points) an xarray Dataset, and return it with the validated
+    schema of the columns needed by ``glyph`` and ``agg``.
+    """
     if isinstance(source, DataArray):
         if not source.name:
             source.name = 'value'
         source = source.reset_coords()
     if isinstance(source, Dataset):
+        from .glyphs import Point
+
         columns = list(source.coords.keys()) + list(source.data_vars.keys())
         cols_to_keep = _cols_to_keep(columns, glyph, agg)
         source = source.drop([col for col in columns if col not in cols_to_keep])
+        if isinstance(glyph, Point):
+            # Points are aggregated from the variables' arrays directly
+            dshape = dshape_from_xarray_dataset(source, cols_to_keep)
+            schema = dshape.measure
+            glyph.validate(schema)
+            agg.validate(schema)
+            return source, schema
         source = source.to_dask_dataframe()
 
-    if isinstance(source, pd.DataFrame):
+    if isinstance(source, dict) or (isinstance(source, np.ndarray) and
+                                    source.dtype.names):
+        source = ArrayColumns(source)
+
+    if isinstance(source, (pd.DataFrame, ArrayColumns)):
         # Avoid datashape.Categorical instantiation bottleneck
-        # by only retaining the necessary columns:
+        # by only describing the necessary columns:
         # https://github.com/bokeh/datashader/issues/396
-        # Preserve column ordering without duplicates
+        # The glyphs and reductions pull the arrays of the columns they need
+        # by name, so the frame itself is passed on without copying it.
         cols_to_keep = _cols_to_keep(source.columns, glyph, agg)
-        if len(cols_to_keep) < len(source.columns):
-            source = source[cols_to_keep]
-        dshape = dshape_from_pandas(source)
+        dshape = dshape_from_pandas(source, cols_to_keep)
     elif isinstance(source, dd.DataFrame):
-        dshape = dshape_from_dask(source)
+        cols_to_keep = _cols_to_keep(source.columns, glyph, agg)
+        # Categories are part of the schema; only unknown ones (e.g. from
+        # read_csv) need computing (once per frame), and are then set on
+        # every partition so that the category codes agree
+        unknown = [col for col in cols_to_keep
+                   if is_categorical_dtype(source._meta[col]) and
+                   not has_known_categories(source._meta[col])]
+        if unknown:
+            source = source.assign(**{
+                col: source[col].cat.set_categories(
+                    _known_categories(source, col))
+                for col in unknown})
+        dshape = dshape_from_dask(source, cols_to_keep)
     else:
-        raise ValueError("source must be a pandas or dask DataFrame")
+        raise ValueError("source must be a pandas or dask DataFrame, a dict "
+                         "of arrays or a structured array")
     schema = dshape.measure
     glyph.validate(schema)
     agg.validate(schema)
-    canvas.validate()
+    return source, schema
 
-    # All-NaN objects (e.g. chunks of arrays with no data) are valid in Datashader
-    with np.warnings.catch_warnings():
-        np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
-        return bypixel.pipeline(source, schema, canvas, glyph, agg)
+
+# Categories computed for the categorical columns of dask DataFrames with
+# unknown categories, by frame name and column, least recently used first
+_categories_cache = OrderedDict()
+_categories_cache_size = 128
+
+
+def _known_categories(df, col):
+    """Return the categories of the column ``col`` of the dask DataFrame
+    ``df``, computing them only the first time for a given ``df``."""
+    key = (df._name, col)
+    if key in _categories_cache:
+        cats = _categories_cache[key] = _categories_cache.pop(key)
+        return cats
+    cats = df[col].cat.as_known()._meta.cat.categories
+    _categories_cache[key] = cats
+    while len(_categories_cache) > _categories_cache_size:
+        _categories_cache.popitem(last=False)
+    return cats
 
 
 def _cols_to_keep(columns, glyph, agg):
@@ -695,4 +911,654 @@ def _cols_to_keep(columns, glyph, agg):
     return [col for col, keepit in cols_to_keep.items() if keepit]
 
 
+def _view_transforms(canvases, x_bounds=None, y_bounds=None):
+    """Return the ``(shape, vt, bounds, coords)`` of every canvas of a
+    ``Canvas.multi`` aggregation.
+
+    ``x_bounds`` and ``y_bounds`` are the bounds of the data, used for the
+    canvases without an ``x_range`` or ``y_range``.
+    """
+    views = []
+    for canvas in canvases:
+        x_range = canvas.x_range or x_bounds
+        y_range = canvas.y_range or y_bounds
+        width = canvas.plot_width
+        height = canvas.plot_height
+        x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+        y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+        coords = [canvas.y_axis.compute_index(y_st, height),
+                  canvas.x_axis.compute_index(x_st, width)]
+        views.append(((height, width), x_st + y_st,
+                      tuple(x_range) + tuple(y_range), coords))
+    return views
+
+
+def _coarsen_bases(bases, combine, y_factor=2, x_factor=2):
+    """Combine every ``y_factor`` x ``x_factor`` block of pixels of ``bases``
+    into a single pixel."""
+    blocks = [tuple(b[i::y_factor, j::x_factor] for b in bases)
+              for i in range(y_factor) for j in range(x_factor)]
+    return combine(blocks)
+
+
 bypixel.pipeline = Dispatcher()
+bypixel.extend = Dispatcher()
+bypixel.multi = Dispatcher()
+bypixel.extend_multi = Dispatcher()
+
+
+class Accumulator(object):
+    """Aggregate data incrementally, one batch of rows at a time.
+
+    ``Canvas.points`` and friends always aggregate a source from scratch and
+    return finalized aggregates. An ``Accumulator`` instead keeps the raw base
+    arrays of the reduction (e.g. the sums and counts of a ``mean``) between
+    calls: ``extend`` aggregates a new batch on top of them, and ``finalize``
+    builds the ``xarray`` aggregate from the current bases without modifying
+    them, so it can be called after every batch.
+
+    Consecutive pandas batches of a line glyph with ``axis=0`` are joined,
+    as if they were a single frame.
+
+    Parameters
+    ----------
+    canvas : Canvas
+        The canvas to aggregate onto. Both ``x_range`` and ``y_range`` must be
+        set, so that every batch is binned onto the same pixels.
+    glyph : Glyph
+    agg : Reduction
+    bases : tuple of ndarray, optional
+        The ``bases`` of an earlier ``Accumulator`` with the same canvas,
+        glyph and reduction, to continue aggregating into.
+    decay : float, optional
+        If provided, the aggregate is multiplied by this factor (in
+        ``(0, 1]``) before each new batch is appended, so that older batches
+        fade out exponentially without any history being stored. Only
+        supported for ``count`` and ``sum`` without an integer ``dtype``;
+        decayed counts are floating point, with ``NaN`` for empty bins.
+
+    Attributes
+    ----------
+    bases : tuple of ndarray or None
+        The raw base arrays of the reduction, None until data is aggregated.
+    schema : datashape.Record or None
+        The schema of the aggregated data, set by the first batch.
+    span : tuple or None
+        With ``decay``, the range of all the values aggregated so far,
+        decayed at the same rate as the data. It is stored in the ``span``
+        attribute of the finalized aggregate, which ``shade`` uses to keep
+        the color scale stable from frame to frame.
+    """
+    def __init__(self, canvas, glyph, agg, bases=None, decay=None):
+        if canvas.x_range is None or canvas.y_range is None:
+            raise ValueError('Accumulator requires a canvas with both '
+                             'x_range and y_range set')
+        if decay is not None:
+            if not getattr(agg, '_decayable', False):
+                raise ValueError('decay is only supported for count and sum '
+                                 'reductions')
+            if not 0 < decay <= 1:
+                raise ValueError('decay must be in the interval (0, 1]')
+            if agg.dtype is not None and agg.dtype.kind != 'f':
+                # Decayed values are fractional
+                raise ValueError('decay requires a floating point dtype, '
+                                 'not {0}'.format(agg.dtype))
+        canvas.validate()
+        self.canvas = canvas
+        self.glyph = glyph
+        self.agg = agg
+        self.bases = bases
+        self.decay = decay
+        self.span = None if decay is None else (0, 0)
+        self.schema = None
+        self._tail = None
+
+    def extend(self, source):
+        """Aggregate the rows of ``source`` into the bases.
+
+        Parameters
+        ----------
+        source : pandas.DataFrame, dask.DataFrame, xarray.DataArray/Dataset,
+                 dict of arrays, or structured array
+            The batch to aggregate. All batches must provide the same
+            columns; categorical columns must have the same categories.
+
+        Returns
+        -------
+        self : Accumulator
+        """
+        from .glyphs import LineAxis0, LineAxis0Multi
+
+        source, schema = _prepare_source(source, self.glyph, self.agg)
+        if self.schema is None:
+            self.schema = schema
+        elif self.agg.out_dshape(schema) != self.agg.out_dshape(self.schema):
+            raise ValueError('source is not compatible with the previously '
+                             'aggregated data: {0} != {1}'.format(
+                                 self.agg.out_dshape(schema),
+                                 self.agg.out_dshape(self.schema)))
+
+        kwargs = {}
+        if (isinstance(self.glyph, (LineAxis0, LineAxis0Multi)) and
+                isinstance(source, (pd.DataFrame, ArrayColumns)) and
+                len(source)):
+            if self._tail is not None:
+                concat = (ArrayColumns.concat
+                          if isinstance(source, ArrayColumns) else pd.concat)
+                source = concat([self._tail, source])
+                kwargs['plot_start'] = False
+            self._tail = source.iloc[-1:]
+
+        if self.decay is not None and self.bases is not None:
+            self.bases = self.agg._decay(self.bases, self.decay)
+
+        with np.warnings.catch_warnings():
+            np.warnings.filterwarnings('ignore', r'All-NaN (slice|axis) encountered')
+            self.bases = bypixel.extend(source, schema, self.canvas, self.glyph,
+                                        self.agg, self.bases, **kwargs)
+            if self.decay is not None:
+                self._update_span()
+        return self
+
+    def _update_span(self):
+        lo, hi = self.span
+        agg = self.bases[0]
+        if agg.size and not np.isnan(agg).all():
+            lo = min(lo * self.decay, np.nanmin(agg))
+            hi = max(hi * self.decay, np.nanmax(agg))
+        else:
+            lo, hi = lo * self.decay, hi * self.decay
+        self.span = (float(lo), float(hi))
+
+    def combine(self, *others):
+        """Merge the bases of other accumulators into this one.
+
+        Parameters
+        ----------
+        others : Accumulator
+            Accumulators with the same canvas, glyph and reduction.
+
+        Returns
+        -------
+        self : Accumulator
+        """
+        others = [o for o in others if o.bases is not None]
+        if not others:
+            return self
+        for other in others:
+            if self.schema is None:
+                self.schema = other.schema
+            elif (self.agg.out_dshape(other.schema) !=
+                    self.agg.out_dshape(self.schema)):
+                raise ValueError('Cannot combine accumulators of '
+                                 'incompatible data')
+        bases = [o.bases for o in others]
+        if self.bases is not None:
+            bases.insert(0, self.bases)
+        if len(bases) == 1:
+            self.bases = tuple(b.copy() for b in bases[0])
+        else:
+            combine = compile_components(self.agg, self.schema, self.glyph)[3]
+            self.bases = combine(bases)
+        return self
+
+    def finalize(self):
+        """Return the aggregate of all the data seen so far.
+
+        Returns
+        -------
+        aggregate : xarray.DataArray or xarray.Dataset
+        """
+        if self.schema is None:
+            raise ValueError('No data has been aggregated yet')
+        create, _, _, _, finalize = \
+            compile_components(self.agg, self.schema, self.glyph)
+        canvas = self.canvas
+        if self.bases is None:
+            self.bases = create((canvas.plot_height, canvas.plot_width))
+        x_st = canvas.x_axis.compute_scale_and_translate(canvas.x_range,
+                                                         canvas.plot_width)
+        y_st = canvas.y_axis.compute_scale_and_translate(canvas.y_range,
+                                                         canvas.plot_height)
+        x_axis = canvas.x_axis.compute_index(x_st, canvas.plot_width)
+        y_axis = canvas.y_axis.compute_index(y_st, canvas.plot_height)
+        agg = finalize(tuple(b.copy() for b in self.bases),
+                       coords=[y_axis, x_axis],
+                       dims=[self.glyph.y_label, self.glyph.x_label])
+        if self.span is not None and self.span[1] > self.span[0]:
+            agg.attrs['span'] = self.span
+        return agg
+
+
+class AggregateCache(object):
+    """A least-recently-used cache of aggregates.
+
+    Used by ``bypixel`` for canvases created with ``cache=...``. Entries are
+    keyed by a token of the data, the glyph, the reduction, and the ranges,
+    shape and axis types of the canvas, and hold the raw base arrays of the
+    reduction. A request of points whose viewport is a crop and/or an
+    integer subsampling of the pixel grid of a cached aggregate, ending at
+    its upper edges, is served from it by slicing the bases and combining
+    blocks of pixels, without touching the data. Views without both
+    ``x_range`` and ``y_range`` set, and views of other glyphs, are only
+    reused when requested again exactly.
+
+    In-memory sources are hashed once, and then identified by the object
+    itself while it is alive, so they must not be modified in place while
+    their aggregates are cached.
+
+    A request of points with the same shape and scale as a cached
+    aggregate, but panned along one axis by a whole number of pixels,
+    reuses the overlapping region of the cached bases and only aggregates
+    the newly exposed strip and the last pixels of either view, in one pass
+    over the data.
+
+    Pixel grids must line up exactly, as computed by the axes: otherwise
+    the request is aggregated from scratch. Reused views are then equal to
+    fresh renders.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget of the cached arrays. The least recently used entries
+        are evicted to stay within it. Default is 256 MB.
+    partitions : bool, optional
+        Whether to also cache the bases of every partition of dask
+        DataFrames, keyed by a token of the partition's task, the glyph, the
+        reduction and the ranges and shape of the canvas. Aggregating a
+        DataFrame sharing partitions with a previously aggregated one (e.g.
+        an append-only dataset with new partitions) then only aggregates
+        the new or changed partitions. Lines, whose partitions are joined
+        to their neighbours, are not cached by partition. Default is False.
+
+    Attributes
+    ----------
+    nbytes : int
+        The memory used by the cached arrays.
+    hits, pans, misses : int
+        The number of requests served from the cache (exactly or derived),
+        by aggregating only the strips exposed by a pan, and by aggregating
+        all the data.
+    partition_hits : int
+        The number of dask partitions whose bases were taken from the cache.
+    """
+    def __init__(self, max_bytes=2 ** 28, partitions=False):
+        self.max_bytes = max_bytes
+        self.partitions = partitions
+        self.nbytes = 0
+        self.hits = 0
+        self.pans = 0
+        self.misses = 0
+        self.partition_hits = 0
+        self._entries = OrderedDict()
+        # id(source) -> (weak reference to source, token)
+        self._tokens = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Remove all the cached aggregates."""
+        self._entries.clear()
+        self.nbytes = 0
+
+    def aggregate(self, source, schema, canvas, glyph, agg, token=None):
+        """Return the aggregate of ``source`` on ``canvas``, from the cache
+        if possible. Arguments are as for ``bypixel.pipeline``; ``token``
+        identifies the data, and defaults to a token of ``source``."""
+        from .glyphs import Point
+
+        if token is None:
+            token = self._token(source)
+        prefix = (token, glyph, agg, type(canvas.x_axis),
+                  type(canvas.y_axis))
+        key = prefix + (canvas.x_range, canvas.y_range, canvas.plot_width,
+                        canvas.plot_height)
+        if key in self._entries:
+            entry = self._touch(key)
+            self.hits += 1
+            if entry.bases is None:
+                return entry.agg.copy()
+            return self._finalize(entry.schema, canvas, glyph, agg,
+                                  entry.bases)
+
+        # Only points map to the same pixels of a crop or subsampling of the
+        # grid; lines would be clipped to different bounds
+        if (canvas.x_range is not None and canvas.y_range is not None and
+                isinstance(glyph, Point)):
+            # Most recently used entries first
+            for k, entry in list(self._entries.items())[::-1]:
+                if k[:5] != prefix or entry.bases is None:
+                    continue
+                bases = _derive_bases(entry.canvas, canvas, entry.bases,
+                                      entry.combine)
+                if bases is not None:
+                    self._touch(k)
+                    self.hits += 1
+                    return self._finalize(entry.schema, canvas, glyph, agg,
+                                          bases, copy=False)
+
+        # Strips of lines would be clipped to their own bounds
+        if (canvas.x_range is not None and canvas.y_range is not None and
+                isinstance(glyph, Point)):
+            def aggregate_strips(strips):
+                return bypixel.extend_multi(source, schema, strips, glyph, agg)
+
+            create = compile_components(agg, schema, glyph)[0]
+            for k, entry in list(self._entries.items())[::-1]:
+                if k[:5] != prefix or entry.bases is None:
+                    continue
+                bases = _pan_bases(entry.canvas, canvas, entry.bases, create,
+                                   aggregate_strips)
+                if bases is not None:
+                    self.pans += 1
+                    self._store(key, _CacheEntry(canvas, schema, entry.combine,
+                                                 bases, None))
+                    return self._finalize(schema, canvas, glyph, agg, bases)
+
+        self.misses += 1
+        if canvas.x_range is None or canvas.y_range is None:
+            result = bypixel.pipeline(source, schema, canvas, glyph, agg)
+            self._store(key, _CacheEntry(canvas, schema, None, None, result))
+            return result.copy()
+
+        combine = compile_components(agg, schema, glyph)[3]
+        bases = bypixel.extend(source, schema, canvas, glyph, agg, None)
+        self._store(key, _CacheEntry(canvas, schema, combine, bases, None))
+        return self._finalize(schema, canvas, glyph, agg, bases)
+
+    def _partition_bases(self, key):
+        """Return the cached bases of a dask partition, or None."""
+        if key not in self._entries:
+            return None
+        self.partition_hits += 1
+        return self._touch(key).bases
+
+    def _store_partition(self, key, bases):
+        self._store(key, _CacheEntry(None, None, None, bases, None))
+
+    def _token(self, source):
+        """Return a token of ``source``, memoized by identity unless it is a
+        dask DataFrame (whose token is cheap)."""
+        from dask.base import tokenize
+
+        if isinstance(source, dd.DataFrame):
+            return tokenize(source)
+        key = id(source)
+        if key in self._tokens:
+            ref, token = self._tokens[key]
+            if ref() is source:
+                return token
+        token = tokenize(source)
+        try:
+            ref = weakref.ref(source,
+                              lambda _, key=key: self._tokens.pop(key, None))
+        except TypeError:
+            # Not weakly referenceable (e.g. a dict of arrays)
+            return token
+        self._tokens[key] = (ref, token)
+        return token
+
+    def _touch(self, key):
+        # Move the entry to the most recently used end
+        entry = self._entries[key] = self._entries.pop(key)
+        return entry
+
+    def _finalize(self, schema, canvas, glyph, agg, bases, copy=True):
+        finalize = compile_components(agg, schema, glyph)[4]
+        if copy:
+            bases = tuple(b.copy() for b in bases)
+        x_st = canvas.x_axis.compute_scale_and_translate(canvas.x_range,
+                                                         canvas.plot_width)
+        y_st = canvas.y_axis.compute_scale_and_translate(canvas.y_range,
+                                                         canvas.plot_height)
+        coords = [canvas.y_axis.compute_index(y_st, canvas.plot_height),
+                  canvas.x_axis.compute_index(x_st, canvas.plot_width)]
+        return finalize(bases, coords=coords,
+                        dims=[glyph.y_label, glyph.x_label])
+
+    def _store(self, key, entry):
+        if entry.nbytes > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+
+class _CacheEntry(object):
+    """The raw bases (or, for canvases without ranges, the finalized
+    aggregate) of an ``AggregateCache`` entry."""
+    def __init__(self, canvas, schema, combine, bases, agg):
+        self.canvas = canvas
+        self.schema = schema
+        self.combine = combine
+        self.bases = bases
+        self.agg = agg
+        if bases is not None:
+            self.nbytes = sum(b.nbytes for b in bases)
+        else:
+            self.nbytes = agg.nbytes
+
+
+def _grid_slice(axis, cached_range, cached_n, range, n):
+    """Return ``(start, factor)`` such that pixels ``start + i * factor`` to
+    ``start + (i + 1) * factor`` of a cached axis make up pixel ``i`` of the
+    requested one, or None if the pixel grids don't line up exactly.
+
+    The requested range must end where the cached one does: points on an
+    upper edge inside the cached range were binned into the pixel above it,
+    but belong to the last pixel of the requested range."""
+    cs, ct = axis.compute_scale_and_translate(cached_range, cached_n)
+    s, t = axis.compute_scale_and_translate(range, n)
+    factor = int(round(cs / s))
+    start = int(round(ct - t * factor))
+    if (factor < 1 or cs != s * factor or ct != t * factor + start or
+            start < 0 or start + n * factor != cached_n):
+        return None
+    return start, factor
+
+
+def _derive_bases(cached, canvas, bases, combine):
+    """Derive the bases of ``canvas`` from the ``bases`` of the ``cached``
+    canvas, or return None if ``canvas`` is not a crop and/or integer
+    subsampling of its pixel grid."""
+    xs = _grid_slice(canvas.x_axis, cached.x_range, cached.plot_width,
+                     canvas.x_range, canvas.plot_width)
+    ys = _grid_slice(canvas.y_axis, cached.y_range, cached.plot_height,
+                     canvas.y_range, canvas.plot_height)
+    if xs is None or ys is None:
+        return None
+    (x0, x_factor), (y0, y_factor) = xs, ys
+    crop = tuple(b[y0:y0 + canvas.plot_height * y_factor,
+                   x0:x0 + canvas.plot_width * x_factor] for b in bases)
+    if x_factor == y_factor == 1:
+        return tuple(b.copy() for b in crop)
+    return _coarsen_bases(crop, combine, y_factor, x_factor)
+
+
+def _pan_shift(axis, cached_range, range, n):
+    """Return the number of pixels by which ``range`` is shifted from the
+    ``cached_range`` of an axis with ``n`` pixels, or None if the scales
+    differ, the pixel grids aren't shifted by exactly a whole number of
+    pixels or they don't overlap."""
+    cs, ct = axis.compute_scale_and_translate(cached_range, n)
+    s, t = axis.compute_scale_and_translate(range, n)
+    shift = int(round(ct - t))
+    if cs != s or ct != t + shift or abs(shift) >= n:
+        return None
+    return shift
+
+
+def _pan_strips(shift, n):
+    """Return the ``(start, stop)`` ranges of the pixels of a panned axis with
+    ``n`` pixels to aggregate again, rather than copy from the cached grid.
+
+    These are the newly exposed pixels, and the pixels that are the last one
+    of either grid but not of the other, as the last pixel also holds the
+    points on the upper edge."""
+    if shift > 0:
+        return [(n - 1 - shift, n)]
+    if -shift >= n - 2:
+        return [(0, n)]
+    return [(0, -shift), (n - 1, n)]
+
+
+def _strip_range(axis, st, range, n, start, stop):
+    """Return the data range of pixels ``start`` to ``stop`` of the pixel grid
+    with scale and translate ``st`` of an axis with ``n`` pixels and data
+    range ``range``, or None if its own pixel grid wouldn't line up exactly.
+
+    Ranges ending before the last pixel are extended by one pixel, whose
+    upper edge takes the points on the upper edge of the strip, and which
+    is then dropped."""
+    s, t = st
+    stop = min(stop + 1, n) if stop < n else n
+    lo = range[0] if start == 0 else axis.inverse_mapper((start - t) / s)
+    hi = range[1] if stop == n else axis.inverse_mapper((stop - t) / s)
+    if axis.compute_scale_and_translate((lo, hi), stop - start) != \
+            (s, t - start):
+        return None
+    return (lo, hi), stop - start
+
+
+def _pan_bases(cached, canvas, bases, create, aggregate):
+    """Compute the bases of ``canvas`` from the ``bases`` of the ``cached``
+    canvas it is panned from along a single axis, aggregating only the
+    strips that differ with ``aggregate(strip_canvases)``, in one pass.
+    Returns None if ``canvas`` is not such a pan of ``cached``."""
+    width, height = canvas.plot_width, canvas.plot_height
+    if (cached.plot_width, cached.plot_height) != (width, height):
+        return None
+    dx = _pan_shift(canvas.x_axis, cached.x_range, canvas.x_range, width)
+    dy = _pan_shift(canvas.y_axis, cached.y_range, canvas.y_range, height)
+    # Diagonal pans would need as many strips as a full aggregation
+    if dx is None or dy is None or (dx != 0) == (dy != 0):
+        return None
+
+    if dx:
+        axis, range, n, shift = canvas.x_axis, canvas.x_range, width, dx
+    else:
+        axis, range, n, shift = canvas.y_axis, canvas.y_range, height, dy
+    st = axis.compute_scale_and_translate(range, n)
+    strips, canvases = [], []
+    for start, stop in _pan_strips(shift, n):
+        strip = _strip_range(axis, st, range, n, start, stop)
+        if strip is None:
+            return None
+        (lo, hi), size = strip
+        if dx:
+            strip = Canvas(plot_width=size, plot_height=height,
+                           x_range=(lo, hi), y_range=canvas.y_range,
+                           threads=canvas.threads)
+        else:
+            strip = Canvas(plot_width=width, plot_height=size,
+                           x_range=canvas.x_range, y_range=(lo, hi),
+                           threads=canvas.threads)
+        strip.x_axis, strip.y_axis = canvas.x_axis, canvas.y_axis
+        strips.append((start, stop))
+        canvases.append(strip)
+
+    # Pixels of the new and cached grids in the overlap
+    if shift >= 0:
+        dst, src = slice(0, n - shift), slice(shift, n)
+    else:
+        dst, src = slice(-shift, n), slice(0, n + shift)
+    new = create((height, width))
+    for b, old in zip(new, bases):
+        if dx:
+            b[:, dst] = old[:, src]
+        else:
+            b[dst] = old[src]
+    for (start, stop), strip_bases in zip(strips, aggregate(canvases)):
+        for b, s in zip(new, strip_bases):
+            if dx:
+                b[:, start:stop] = s[:, :stop - start]
+            else:
+                b[start:stop] = s[:stop - start]
+    return new
+
+
+def precompile(source, glyphs, aggs, canvas_shapes=((600, 600),),
+               x_axis_type='linear', y_axis_type='linear', shade=True):
+    """Compile the kernels needed to aggregate and shade ``source`` up front.
+
+    Datashader compiles its aggregation kernels on first use, for every
+    combination of column types, glyph and reduction. Calling this function
+    at startup moves that cost out of the first user request. No data is
+    aggregated: the kernels are run on an empty frame with the same schema.
+
+    Parameters
+    ----------
+    source : pandas.DataFrame or dask.DataFrame
+        A frame (or an empty frame, e.g. ``ddf._meta``) with the same columns
+        and dtypes as the data that will be aggregated.
+    glyphs : list of Glyph
+        The glyphs to compile, e.g. ``[Point('x', 'y')]``.
+    aggs : list of Reduction
+        The reductions to compile for each glyph.
+    canvas_shapes : list of tuple, optional
+        ``(plot_width, plot_height)`` of the canvases to warm up.
+    x_axis_type, y_axis_type : str, optional
+        The axis types of the canvases, as for ``Canvas``.
+    shade : bool, optional
+        Whether to also compile the kernels used by ``shade`` and ``spread``.
+
+    Returns
+    -------
+    timings : OrderedDict
+        Maps ``(glyph, agg, step)`` to the number of seconds spent in that
+        step, where step is one of ``'compile'`` (code generation),
+        ``'aggregate'`` (jit compiling the kernels) or ``'shade'``.
+    """
+    from . import transfer_functions as tf
+
+    if isinstance(source, dd.DataFrame):
+        source = source._meta
+    elif isinstance(source, pd.DataFrame):
+        source = source.iloc[:0]
+    else:
+        raise ValueError("source must be a pandas or dask DataFrame")
+
+    # The empty frame has no bounds, so give the canvases valid ranges
+    ranges = {'linear': (0, 1), 'log': (1, 10)}
+    canvases = [Canvas(plot_width=w, plot_height=h, x_axis_type=x_axis_type,
+                       y_axis_type=y_axis_type, x_range=ranges[x_axis_type],
+                       y_range=ranges[y_axis_type])
+                for (w, h) in canvas_shapes]
+    x_mapper = canvases[0].x_axis.mapper
+    y_mapper = canvases[0].y_axis.mapper
+
+    timings = OrderedDict()
+    for glyph in glyphs:
+        for agg in aggs:
+            start = default_timer()
+            df, schema = _prepare_source(source, glyph, agg)
+            create, info, append, _, _ = compile_components(agg, schema, glyph)
+            glyph._build_extend(x_mapper, y_mapper, info, append)
+            timings[(glyph, agg, 'compile')] = default_timer() - start
+
+            start = default_timer()
+            results = [bypixel(df, canvas, glyph, agg) for canvas in canvases]
+            timings[(glyph, agg, 'aggregate')] = default_timer() - start
+
+            if shade:
+                start = default_timer()
+                for result in results:
+                    _precompile_shade(tf, result)
+                timings[(glyph, agg, 'shade')] = default_timer() - start
+    return timings
+
+
+def _precompile_shade(tf, agg):
+    if isinstance(agg, Dataset):
+        for name in agg.data_vars:
+            _precompile_shade(tf, agg[name])
+        return
+    if agg.ndim == 2:
+        img = tf.shade(agg)
+    else:
+        img = tf.Image(np.zeros(agg.shape[:2], dtype='uint32'),
+                       coords=list(agg.coords.values())[:2], dims=agg.dims[:2])
+    tf.dynspread(tf.spread(img, px=1))
@@ -1,23 +1,205 @@
 from __future__ import absolute_import, division
 
+import threading
+from collections import OrderedDict
+
 import dask
+import dask.array as da
+import dask.local
+import dask.threaded
+import numpy as np
 import pandas as pd
 import dask.dataframe as dd
+import xarray as xr
 from dask.base import tokenize, compute
+from dask.core import istask
+from dask.optimization import cull
 
-from .core import bypixel
-from .compatibility import apply
+from .core import bypixel, _view_transforms
 from .compiler import compile_components
-from .glyphs import Glyph, LineAxis0
+from .glyphs import Glyph, LineAxis0, LineAxis0Multi, Point
+from .pandas import extend_multi_bases
 from .utils import Dispatcher
 
 __all__ = ()
 
 
+# Defaults of the ``datashader.*`` settings of ``dask.config``, which tune
+# how dask DataFrames are aggregated, e.g. within
+# ``dask.config.set({'datashader.split_every': 4})``:
+#
+# split_every
+#     Maximum number of partial aggregates combined by a single task. The
+#     aggregates of the partitions are combined in a tree of such tasks, so
+#     that at most this many full canvas aggregates are stacked at once.
+# partitions_per_task
+#     Number of consecutive partitions aggregated into the same bases by a
+#     single task, which reduces the number of partial aggregates to
+#     combine.
+# shared_accumulators
+#     Whether, with the local threaded (or synchronous) scheduler, every
+#     worker thread aggregates all the partitions it processes into a single
+#     buffer of bases, merged once all partitions are done. Memory then
+#     scales with the number of threads instead of the number of partitions.
+# prune_partitions
+#     Whether auto-ranging dask DataFrames of points computes (and caches,
+#     like the bounds) the extents of every partition rather than only the
+#     overall bounds, so that the partitions outside of the ranges of later
+#     canvases are not aggregated. Extents are never computed only for
+#     pruning; and partitions are pruned by their divisions whenever the
+#     index is one of the coordinate columns.
+# bounds_cache_size
+#     Maximum number of dask DataFrames whose coordinate extents are cached.
+config_defaults = {'split_every': 8, 'partitions_per_task': 1,
+                   'shared_accumulators': False, 'prune_partitions': True,
+                   'bounds_cache_size': 128}
+
+
+def _config(name):
+    """Return the ``datashader.<name>`` setting of ``dask.config``."""
+    return dask.config.get('datashader.' + name, config_defaults[name])
+
+
+# Coordinate extents of dask DataFrames, least recently used first
+_bounds_cache = OrderedDict()
+
+
 @bypixel.pipeline.register(dd.DataFrame)
 def dask_pipeline(df, schema, canvas, glyph, summary):
-    dsk, name = glyph_dispatch(glyph, df, schema, canvas, summary)
+    create, _, _, _, finalize = compile_components(summary, schema, glyph)
+    dims = [glyph.y_label, glyph.x_label]
+    if canvas.lazy:
+        dsk, name, axis = glyph_dispatch(glyph, df, schema, canvas, summary)
+        return lazy_finalize(df, dsk, name, create, finalize, axis, dims)
+    bases, axis = aggregate(df, schema, canvas, glyph, summary)
+    return finalize(bases, coords=axis, dims=dims)
+
+
+@bypixel.extend.register(dd.DataFrame)
+def dask_extend(df, schema, canvas, glyph, summary, bases, **kwargs):
+    aggs = aggregate(df, schema, canvas, glyph, summary)[0]
+    if bases is None:
+        return aggs
+    combine = compile_components(summary, schema, glyph)[3]
+    return combine([bases, aggs])
+
+
+@bypixel.multi.register(dd.DataFrame)
+def dask_multi(df, schema, canvases, glyph, summary):
+    finalize = compile_components(summary, schema, glyph)[4]
+    x_bounds = y_bounds = None
+    if any(not c.x_range or not c.y_range for c in canvases):
+        x_extents, y_extents = compute_bounds(glyph, df)
+        x_min, x_max, y_min, y_max = compute(*(x_extents + y_extents))
+        x_bounds, y_bounds = (x_min, x_max), (y_min, y_max)
+    views = _view_transforms(canvases, x_bounds, y_bounds)
+    views_bases = multi_bases(df, schema, canvases, glyph, summary, views)
+    return [finalize(bases, coords=coords,
+                     dims=[glyph.y_label, glyph.x_label])
+            for (bases, (_, _, _, coords)) in zip(views_bases, views)]
+
+
+@bypixel.extend_multi.register(dd.DataFrame)
+def dask_extend_multi(df, schema, canvases, glyph, summary):
+    return multi_bases(df, schema, canvases, glyph, summary,
+                       _view_transforms(canvases))
+
+
+def multi_bases(df, schema, canvases, glyph, summary, views):
+    """Return the combined bases of ``df`` on every canvas of a
+    ``Canvas.multi`` aggregation, whose ``(shape, vt, bounds, coords)`` are
+    ``views``, in one pass over the partitions."""
+    create, _, _, combine, _ = compile_components(summary, schema, glyph)
+
+    def create_views():
+        return [create(shape) for (shape, _, _, _) in views]
+
+    def extend_views(views_bases, *dfs):
+        for df in dfs:
+            views_bases = extend_multi_bases(glyph, df, schema, canvases,
+                                             summary, views, views_bases,
+                                             threads=1)
+        return views_bases
+
+    def combine_views(results):
+        return [combine(list(bs)) for bs in zip(*results)]
+
+    name = tokenize(df.__dask_tokenize__(), canvases, glyph, summary,
+                    [view[1:3] for view in views])
+    dsk = reduction_graph(df, name, create_views, extend_views, combine_views)
+    return compute_graph(df, dsk, name)
+
+
+def aggregate(df, schema, canvas, glyph, summary):
+    """Return the combined bases of ``df`` on ``canvas``, and the coordinates
+    of the aggregate."""
+    cache = canvas.cache
+    if (cache is not None and cache.partitions and
+            not isinstance(glyph, (LineAxis0, LineAxis0Multi))):
+        return incremental_aggregate(df, schema, canvas, glyph, summary,
+                                     cache)
+    dsk, name, axis = glyph_dispatch(glyph, df, schema, canvas, summary)
+    return compute_graph(df, dsk, name), axis
+
 
+def incremental_aggregate(df, schema, canvas, glyph, summary, cache):
+    """Like ``aggregate``, but the bases of every partition are looked up in
+    and stored into the ``AggregateCache`` ``cache``, so that only the
+    partitions not aggregated before on the same canvas are computed."""
+    shape, bounds, st, axis = shape_bounds_st_and_axis(df, canvas, glyph)
+    create, info, append, combine, _ = \
+        compile_components(summary, schema, glyph)
+    extend = glyph._build_extend(canvas.x_axis.mapper, canvas.y_axis.mapper,
+                                 info, append)
+
+    def chunk(df):
+        aggs = create(shape)
+        extend(aggs, df, st, bounds)
+        return aggs
+
+    keys = visible_partitions(glyph, df, bounds)
+    graph = df.__dask_optimize__(df.__dask_graph__(), keys)
+    prefix = ('partition', glyph, summary, type(canvas.x_axis),
+              type(canvas.y_axis), tuple(bounds), shape)
+    cache_keys = [prefix + (partition_token(graph, k),) for k in keys]
+    bases = [cache._partition_bases(k) for k in cache_keys]
+
+    missing = [i for (i, b) in enumerate(bases) if b is None]
+    if missing:
+        name = tokenize(df.__dask_tokenize__(), prefix)
+        dsk = cull(graph, [keys[i] for i in missing])[0]
+        chunk_keys = [(name, i) for i in missing]
+        for i, k in zip(missing, chunk_keys):
+            dsk[k] = (chunk, keys[i])
+        scheduler = dask.base.get_scheduler() or df.__dask_scheduler__
+        for i, aggs in zip(missing, scheduler(dsk, chunk_keys)):
+            cache._store_partition(cache_keys[i], aggs)
+            bases[i] = aggs
+
+    # Combine at most split_every bases at a time, always at least once so
+    # that the cached bases are never returned themselves
+    every = max(2, _config('split_every'))
+    while True:
+        bases = [combine(bases[i:i + every])
+                 for i in range(0, len(bases), every)]
+        if len(bases) == 1:
+            return bases[0], axis
+
+
+def partition_token(graph, key):
+    """Return a token of the task computing the partition ``key`` of the
+    (optimized) ``graph``, which doesn't depend on the name of the
+    DataFrame."""
+    task = graph[key]
+    # Follow the aliases left by renaming fused tasks
+    while not istask(task) and isinstance(task, (str, tuple)) and \
+            task in graph:
+        task = graph[task]
+    return tokenize(task)
+
+
+def compute_graph(df, dsk, name):
+    """Compute the key ``name`` of ``dsk``, a graph built on top of ``df``"""
     # Get user configured scheduler (if any), or fall back to default
     # scheduler for dask DataFrame
     scheduler = dask.base.get_scheduler() or df.__dask_scheduler__
@@ -26,19 +208,143 @@ def dask_pipeline(df, schema, canvas, glyph, summary):
     graph = df.__dask_graph__()
 
     dsk.update(optimize(graph, keys))
+    # Drop the partitions the graph doesn't depend on (e.g. pruned ones)
+    dsk = cull(dsk, [name])[0]
 
     return scheduler(dsk, name)
 
 
+def lazy_finalize(df, dsk, name, create, finalize, coords, dims):
+    """Return the finalized aggregate of the bases ``name`` of ``dsk``, a
+    graph built on top of ``df``, with its data backed by dask arrays.
+
+    The aggregate is finalized in a single task once computed; every data
+    variable is a one chunk dask array taken from its result.
+    """
+    dsk.update(df.__dask_optimize__(df.__dask_graph__(), df.__dask_keys__()))
+    final = 'finalize-' + name
+    dsk[final] = (_finalize_task, finalize, name, coords, dims)
+
+    # Finalize empty bases of a single bin to get the structure of the result
+    meta = finalize(create((1, 1)), coords=[c[:1] for c in coords],
+                    dims=dims)
+    if isinstance(meta, xr.Dataset):
+        return xr.Dataset(dict(
+            (var, _lazy_variable(dsk, final, var, meta[var], coords))
+            for var in meta.data_vars))
+    return _lazy_variable(dsk, final, None, meta, coords)
+
+
+def _finalize_task(finalize, bases, coords, dims):
+    return finalize(bases, coords=coords, dims=dims)
+
+
+def _variable_data(agg, var):
+    return (agg if var is None else agg[var]).data
+
+
+def _lazy_variable(dsk, final, var, meta, coords):
+    """The variable ``var`` (None for a DataArray) of the aggregate computed
+    by the key ``final``, as a DataArray structured like ``meta``."""
+    name = '{0}-{1}'.format(final, var)
+    # Dimensions beyond y and x (e.g. categories) are taken from meta
+    coords = list(coords) + [meta.coords[d].values for d in meta.dims[2:]]
+    shape = tuple(len(c) for c in coords)
+    dsk[(name,) + (0,) * len(shape)] = (_variable_data, final, var)
+    data = da.Array(dsk, name, tuple((n,) for n in shape), meta.dtype)
+    return xr.DataArray(data, coords=coords, dims=meta.dims,
+                        attrs=meta.attrs, name=meta.name)
+
+
+def compute_bounds(glyph, df):
+    """Return the x and y extents of ``df`` for ``glyph``.
+
+    The extents of all the coordinate columns are computed in a single pass
+    over the data, and cached by the token of ``df``, so that rendering the
+    same data again without ranges doesn't read it twice.
+    """
+    if _config('prune_partitions') and isinstance(glyph, Point):
+        # Derive the bounds from (and cache) the extents of the partitions
+        def compute_bounds():
+            extents = partition_extents(glyph, df)
+            return (glyph.maybe_expand_bounds((np.nanmin(extents[:, 0]),
+                                               np.nanmax(extents[:, 1]))),
+                    glyph.maybe_expand_bounds((np.nanmin(extents[:, 2]),
+                                               np.nanmax(extents[:, 3]))))
+    else:
+        def compute_bounds():
+            return glyph.compute_bounds_dask(df)
+    return cached_bounds((df._name, glyph), compute_bounds)
+
+
+def partition_extents(glyph, df):
+    """Return the ``(xmin, xmax, ymin, ymax)`` of every partition of ``df``
+    for ``glyph``, cached by the token of ``df``."""
+    return cached_bounds((df._name, glyph, 'partitions'),
+                         lambda: glyph.compute_partition_extents_dask(df))
+
+
+def visible_partitions(glyph, df, bounds):
+    """Return the keys of the partitions of ``df`` whose points may fall
+    within ``bounds``, or all of them if they can't be pruned.
+
+    Uses the divisions of ``df`` if it is indexed by a coordinate column,
+    else the extents of the partitions if already cached (when auto-ranging
+    with ``prune_partitions`` set, see ``config_defaults``); this never
+    reads the data. At least one partition is kept, so that the graph is
+    never empty.
+
+    The divisions are only those of the index, so an index named after a
+    coordinate column is assumed to hold the values of that column, as
+    after ``df.set_index(column, drop=False)``. Indexes of another dtype
+    than the column (e.g. a renamed integer position) are not used.
+    """
+    keys = df.__dask_keys__()
+    if not isinstance(glyph, Point):
+        return keys
+    xmin, xmax, ymin, ymax = bounds
+    index = df.index.name
+    if (df.known_divisions and index in (glyph.x, glyph.y) and
+            index in df.columns and df.index.dtype == df[index].dtype and
+            df.index.dtype.kind in 'iuf'):
+        lo, hi = (xmin, xmax) if index == glyph.x else (ymin, ymax)
+        divisions = df.divisions
+        keep = [divisions[i + 1] >= lo and divisions[i] <= hi
+                for i in range(df.npartitions)]
+    elif (df._name, glyph, 'partitions') in _bounds_cache:
+        extents = partition_extents(glyph, df)
+        with np.errstate(invalid='ignore'):
+            keep = ((extents[:, 1] >= xmin) & (extents[:, 0] <= xmax) &
+                    (extents[:, 3] >= ymin) & (extents[:, 2] <= ymax))
+    else:
+        return keys
+    return [k for (k, kept) in zip(keys, keep) if kept] or keys[:1]
+
+
+def cached_bounds(key, compute_bounds):
+    """Return the extents cached under ``key`` (which must identify the
+    data, e.g. by its dask token), calling ``compute_bounds()`` on a miss."""
+    if key in _bounds_cache:
+        bounds = _bounds_cache[key] = _bounds_cache.pop(key)
+        return bounds
+    bounds = compute_bounds()
+    _bounds_cache[key] = bounds
+    while len(_bounds_cache) > _config('bounds_cache_size'):
+        _bounds_cache.popitem(last=False)
+    return bounds
+
+
 def shape_bounds_st_and_axis(df, canvas, glyph):
     if not canvas.x_range or not canvas.y_range:
-        x_extents, y_extents = glyph.compute_bounds_dask(df)
+        x_extents, y_extents = compute_bounds(glyph, df)
     else:
         x_extents, y_extents = None, None
 
     x_range = canvas.x_range or x_extents
     y_range = canvas.y_range or y_extents
-    x_min, x_max, y_min, y_max = bounds = compute(*(x_range + y_range))
+    # Always float, so that integer ranges don't compile new kernels
+    bounds = tuple(float(b) for b in compute(*(x_range + y_range)))
+    x_min, x_max, y_min, y_max = bounds
     x_range, y_range = (x_min, x_max), (y_min, y_max)
 
     width = canvas.plot_width
@@ -56,6 +362,8 @@ def shape_bounds_st_and_axis(df, canvas, glyph):
     return shape, bounds, st, axis
 
 
+# Each glyph_dispatch function returns a graph, the key in that graph holding
+# the combined (not yet finalized) bases, and the coordinates of the result.
 glyph_dispatch = Dispatcher()
 
 
@@ -70,21 +378,19 @@ def default(glyph, df, schema, canvas, summary):
     y_mapper = canvas.y_axis.mapper
     extend = glyph._build_extend(x_mapper, y_mapper, info, append)
 
-    def chunk(df):
-        aggs = create(shape)
-        extend(aggs, df, st, bounds)
+    def extend_all(aggs, *dfs):
+        for df in dfs:
+            extend(aggs, df, st, bounds)
         return aggs
 
     name = tokenize(df.__dask_tokenize__(), canvas, glyph, summary)
-    keys = df.__dask_keys__()
-    keys2 = [(name, i) for i in range(len(keys))]
-    dsk = dict((k2, (chunk, k)) for (k2, k) in zip(keys2, keys))
-    dsk[name] = (apply, finalize, [(combine, keys2)],
-                 dict(coords=axis, dims=[glyph.y_label, glyph.x_label]))
-    return dsk, name
+    keys = visible_partitions(glyph, df, bounds)
+    dsk = reduction_graph(df, name, lambda: create(shape), extend_all,
+                          combine, keys=keys, shared=not canvas.lazy)
+    return dsk, name, axis
 
 
-@glyph_dispatch.register(LineAxis0)
+@glyph_dispatch.register((LineAxis0, LineAxis0Multi))
 def line(glyph, df, schema, canvas, summary):
     shape, bounds, st, axis = shape_bounds_st_and_axis(df, canvas, glyph)
 
@@ -95,21 +401,136 @@ def line(glyph, df, schema, canvas, summary):
     y_mapper = canvas.y_axis.mapper
     extend = glyph._build_extend(x_mapper, y_mapper, info, append)
 
-    def chunk(df, df2=None):
-        plot_start = True
-        if df2 is not None:
-            df = pd.concat([df.iloc[-1:], df2])
-            plot_start = False
-        aggs = create(shape)
-        extend(aggs, df, st, bounds, plot_start=plot_start)
+    def extend_all(aggs, prev, *dfs):
+        # prev is the last row of the partition preceding dfs (None for the
+        # first partition), which is joined to the first row of dfs. Lines
+        # aren't joined across empty partitions
+        for df in dfs:
+            last = _last_row(df)
+            if prev is not None and len(prev):
+                df = pd.concat([prev, df])
+                extend(aggs, df, st, bounds, plot_start=False)
+            else:
+                extend(aggs, df, st, bounds, plot_start=True)
+            prev = last
         return aggs
 
     name = tokenize(df.__dask_tokenize__(), canvas, glyph, summary)
-    old_name = df.__dask_tokenize__()
-    dsk = {(name, 0): (chunk, (old_name, 0))}
-    for i in range(1, df.npartitions):
-        dsk[(name, i)] = (chunk, (old_name, i - 1), (old_name, i))
-    keys2 = [(name, i) for i in range(df.npartitions)]
-    dsk[name] = (apply, finalize, [(combine, keys2)],
-                 dict(coords=axis, dims=[glyph.y_label, glyph.x_label]))
-    return dsk, name
+    keys = df.__dask_keys__()
+    dsk = boundary_tasks(name, keys)
+    prev_keys = [None] + [('boundary-' + name, i)
+                          for i in range(len(keys) - 1)]
+    dsk.update(reduction_graph(df, name, lambda: create(shape), extend_all,
+                               combine, prev_keys, shared=not canvas.lazy))
+    return dsk, name, axis
+
+
+def _last_row(df):
+    """The last row of ``df``, or an empty frame if ``df`` is empty"""
+    return df.iloc[-1:]
+
+
+def boundary_tasks(name, keys):
+    """Return a graph holding the last row of every partition ``keys``, with
+    keys ``('boundary-' + name, i)``.
+
+    Each task only depends on its own partition, so that a line chunk needs
+    the last row of the previous partition but not the whole partition, and
+    the boundaries are computed in parallel.
+    """
+    boundary = 'boundary-' + name
+    return {(boundary, i): (_last_row, key) for (i, key) in enumerate(keys)}
+
+
+def reduction_graph(df, name, create, extend, combine, prev_keys=None,
+                    keys=None, shared=True):
+    """Return a graph aggregating the partitions ``keys`` of ``df`` (default
+    all of them) into the key ``name``.
+
+    ``create()`` returns new bases, ``extend(bases, *dfs)`` aggregates
+    partitions into ``bases`` and returns them, and ``combine`` merges a list
+    of bases. See ``chunk_tasks`` for ``prev_keys``. Unless ``shared`` is
+    False (for lazy graphs, which may be computed by any scheduler, and more
+    than once), the chunks share accumulators if ``shared_accumulators``
+    (see ``config_defaults``) is set.
+    """
+    if keys is None:
+        keys = df.__dask_keys__()
+    if (shared and _config('shared_accumulators') and
+            _local_scheduler(df)):
+        return accumulator_tasks(name, keys, create, extend, combine,
+                                 prev_keys)
+
+    def chunk(*args):
+        return extend(create(), *args)
+
+    dsk = chunk_tasks(name, keys, chunk, prev_keys)
+    tree_combine(dsk, name, combine)
+    return dsk
+
+
+def _local_scheduler(df):
+    """Whether ``df`` is computed by threads of the current process"""
+    scheduler = dask.base.get_scheduler() or df.__dask_scheduler__
+    return scheduler in (dask.threaded.get, dask.local.get_sync)
+
+
+def accumulator_tasks(name, keys, create, extend, combine, prev_keys=None):
+    """Like ``chunk_tasks`` followed by ``tree_combine``, but every thread
+    running chunk tasks extends the same bases, created on its first task.
+
+    The chunk tasks return None; the task ``name`` combines the bases of all
+    the threads once every chunk task is done.
+    """
+    accumulators = {}
+
+    def chunk(*args):
+        ident = threading.current_thread().ident
+        if ident not in accumulators:
+            accumulators[ident] = create()
+        accumulators[ident] = extend(accumulators[ident], *args)
+
+    def merge(results):
+        if not accumulators:
+            return create()
+        return combine(list(accumulators.values()))
+
+    dsk = chunk_tasks(name, keys, chunk, prev_keys)
+    dsk[name] = (merge, sorted(dsk))
+    return dsk
+
+
+def chunk_tasks(name, keys, chunk, prev_keys=None):
+    """Return a graph applying ``chunk`` to every ``partitions_per_task``
+    (see ``config_defaults``) consecutive partitions ``keys``, with keys
+    ``(name, i)``.
+
+    If ``prev_keys`` (the key of the partition preceding each one) is given,
+    the key preceding the first partition of each task is passed first.
+    """
+    step = max(1, _config('partitions_per_task'))
+    dsk = {}
+    for i, start in enumerate(range(0, len(keys), step)):
+        task = (chunk,) + tuple(keys[start:start + step])
+        if prev_keys is not None:
+            task = (chunk, prev_keys[start]) + task[1:]
+        dsk[(name, i)] = task
+    return dsk
+
+
+def tree_combine(dsk, name, combine):
+    """Add tasks to ``dsk`` combining the chunk results ``(name, i)`` into the
+    key ``name``, in a tree of ``combine`` calls over at most
+    ``split_every`` (see ``config_defaults``) results each."""
+    keys = sorted(k for k in dsk if isinstance(k, tuple) and k[0] == name)
+    every = max(2, _config('split_every'))
+    depth = 0
+    while len(keys) > every:
+        depth += 1
+        level = '{0}-combine-{1}'.format(name, depth)
+        keys2 = []
+        for i, start in enumerate(range(0, len(keys), every)):
+            dsk[(level, i)] = (combine, keys[start:start + every])
+            keys2.append((level, i))
+        keys = keys2
+    dsk[name] = (combine, keys)
@@ -74,6 +74,38 @@ class _PointLike(Glyph):
 
         return minval, maxval
 
+    def compute_bounds(self, df):
+        """Return the ``(x_bounds, y_bounds)`` of ``df``."""
+        return self.compute_x_bounds(df), self.compute_y_bounds(df)
+
+    def _compute_fused_bounds(self, df):
+        # Bounds of single x and y columns, in one pass over both
+        x_bounds, y_bounds = self._compute_xy_bounds(df[self.x].values,
+                                                     df[self.y].values)
+        return (self.maybe_expand_bounds(x_bounds),
+                self.maybe_expand_bounds(y_bounds))
+
+    @staticmethod
+    @ngjit
+    def _compute_xy_bounds(xs, ys):
+        xmin = ymin = np.inf
+        xmax = ymax = -np.inf
+        for i in range(xs.shape[0]):
+            x = xs[i]
+            if not np.isnan(x):
+                if x < xmin:
+                    xmin = x
+                if x > xmax:
+                    xmax = x
+            y = ys[i]
+            if not np.isnan(y):
+                if y < ymin:
+                    ymin = y
+                if y > ymax:
+                    ymax = y
+
+        return (xmin, xmax), (ymin, ymax)
+
     @staticmethod
     def maybe_expand_bounds(bounds):
         minval, maxval = bounds
@@ -83,16 +115,21 @@ class _PointLike(Glyph):
             minval, maxval = minval-1, minval+1
         return minval, maxval
 
-    @memoize
-    def compute_bounds_dask(self, ddf):
-
-        r = ddf.map_partitions(lambda df: np.array([[
+    def compute_partition_extents_dask(self, ddf):
+        """Return an array of the ``(xmin, xmax, ymin, ymax)`` of every
+        partition of ``ddf`` (``NaN`` for partitions without data)."""
+        return ddf.map_partitions(lambda df: np.array([[
             np.nanmin(df[self.x].values),
             np.nanmax(df[self.x].values),
             np.nanmin(df[self.y].values),
             np.nanmax(df[self.y].values)]]
         )).compute()
 
+    @memoize
+    def compute_bounds_dask(self, ddf):
+
+        r = self.compute_partition_extents_dask(ddf)
+
         x_extents = np.nanmin(r[:, 0]), np.nanmax(r[:, 1])
         y_extents = np.nanmin(r[:, 2]), np.nanmax(r[:, 3])
 
@@ -153,13 +190,29 @@ class Point(_PointLike):
     ----------
     x, y : str
         Column names for the x and y coordinates of each point.
+    x_sorted : bool, optional
+        Whether the ``x`` column is sorted in ascending order (with any
+        ``NaN`` values at the end). If so, only the rows within the x range
+        of the canvas, found by binary search, are aggregated.
     """
+    def __init__(self, x, y, x_sorted=False):
+        super(Point, self).__init__(x, y)
+        self.x_sorted = x_sorted
+
+    @property
+    def inputs(self):
+        return (self.x, self.y, self.x_sorted)
+
+    def compute_bounds(self, df):
+        return self._compute_fused_bounds(df)
+
     @memoize
     def _build_extend(self, x_mapper, y_mapper, info, append):
         x_name = self.x
         y_name = self.y
+        x_sorted = self.x_sorted
 
-        @ngjit
+        @_closure_kernel
         def _extend(vt, bounds, xs, ys, *aggs_and_cols):
             sx, tx, sy, ty = vt
             xmin, xmax, ymin, ymax = bounds
@@ -186,8 +239,59 @@ class Point(_PointLike):
         def extend(aggs, df, vt, bounds):
             xs = df[x_name].values
             ys = df[y_name].values
-            cols = aggs + info(df)
-            _extend(vt, bounds, xs, ys, *cols)
+            cols = info(df)
+            if x_sorted:
+                rows = _sorted_rows(xs, bounds[0], bounds[1])
+                xs, ys = xs[rows], ys[rows]
+                cols = tuple(c[rows] for c in cols)
+            _extend(vt, bounds, xs, ys, *(aggs + cols))
+
+        return extend
+
+    @memoize
+    def _build_multi_extend(self, x_mapper, y_mapper, info, append):
+        """Like ``_build_extend``, but ``extend(views_aggs, df, vts, bounds)``
+        appends every row to several aggregates (views) in one pass.
+
+        ``views_aggs`` is a list with the aggregate tuple of every view;
+        ``vts`` and ``bounds`` are ``(n_views, 4)`` arrays with the scale and
+        translate parameters and the bounds of each view.
+        """
+        x_name = self.x
+        y_name = self.y
+        x_sorted = self.x_sorted
+
+        @_closure_kernel
+        def _extend(vts, bounds, xs, ys, views):
+            for i in range(xs.shape[0]):
+                x = xs[i]
+                y = ys[i]
+                mx = x_mapper(x)
+                my = y_mapper(y)
+                for v in range(len(views)):
+                    if not (bounds[v, 0] <= x <= bounds[v, 1] and
+                            bounds[v, 2] <= y <= bounds[v, 3]):
+                        continue
+                    xi = int(mx * vts[v, 0] + vts[v, 1])
+                    yi = int(my * vts[v, 2] + vts[v, 3])
+                    if x == bounds[v, 1]:
+                        xi -= 1
+                    if y == bounds[v, 3]:
+                        yi -= 1
+                    append(i, xi, yi, *views[v])
+
+        def extend(views_aggs, df, vts, bounds):
+            xs = df[x_name].values
+            ys = df[y_name].values
+            cols = info(df)
+            if x_sorted:
+                rows = _sorted_rows(xs, bounds[:, 0].min(), bounds[:, 1].max())
+                xs, ys = xs[rows], ys[rows]
+                cols = tuple(c[rows] for c in cols)
+            # Every view has aggregates of the same types, so the views form
+            # a homogeneous tuple that the kernel can index at runtime
+            views = tuple(tuple(aggs) + cols for aggs in views_aggs)
+            _extend(vts, bounds, xs, ys, views)
 
         return extend
 
@@ -199,21 +303,57 @@ class LineAxis0(_PointLike):
     ----------
     x, y : str
         Column names for the x and y coordinates of each vertex.
+    x_sorted : bool, optional
+        Whether the ``x`` column is sorted in ascending order (with any
+        ``NaN`` values at the end). If so, only the vertices within the x
+        range of the canvas and their two outer neighbours, found by binary
+        search, are aggregated.
+    decimate : bool, optional
+        Whether to reduce every run of consecutive vertices falling into the
+        same pixel column to its first, last, lowest and highest vertices
+        before drawing (M4 decimation). The pixels touched by the line are
+        unchanged, but not how many times each is touched, so this is only
+        exact for the ``any()`` reduction. Effective on sorted x, where each
+        pixel column is a single run.
     """
+    def __init__(self, x, y, x_sorted=False, decimate=False):
+        super(LineAxis0, self).__init__(x, y)
+        self.x_sorted = x_sorted
+        self.decimate = decimate
+
+    @property
+    def inputs(self):
+        return (self.x, self.y, self.x_sorted, self.decimate)
+
+    def compute_bounds(self, df):
+        return self._compute_fused_bounds(df)
+
     @memoize
     def _build_extend(self, x_mapper, y_mapper, info, append):
         draw_line = _build_draw_line(append)
         map_onto_pixel = _build_map_onto_pixel_for_line(x_mapper, y_mapper)
         extend_line = _build_extend_line_axis0(draw_line, map_onto_pixel)
+        decimate_rows = _build_decimate_rows(x_mapper)
         x_name = self.x
         y_name = self.y
+        x_sorted = self.x_sorted
+        decimate = self.decimate
 
         def extend(aggs, df, vt, bounds, plot_start=True):
             xs = df[x_name].values
             ys = df[y_name].values
-            cols = aggs + info(df)
+            cols = info(df)
+            if x_sorted:
+                # Keep the segments crossing into the range on either side
+                rows = _sorted_rows(xs, bounds[0], bounds[1], pad=1)
+                xs, ys = xs[rows], ys[rows]
+                cols = tuple(c[rows] for c in cols)
+            if decimate:
+                rows = decimate_rows(xs, ys, vt[0], vt[1])
+                xs, ys = xs[rows], ys[rows]
+                cols = tuple(c[rows] for c in cols)
             # line may be clipped, then mapped to pixels
-            extend_line(vt, bounds, xs, ys, plot_start, *cols)
+            extend_line(vt, bounds, xs, ys, plot_start, *(aggs + cols))
 
         return extend
 
@@ -554,12 +694,15 @@ class Triangles(_PolygonLike):
         extend_triangles = _build_extend_triangles(draw_triangle, draw_triangle_interp, map_onto_pixel)
         weight_type = self.weight_type
         interpolate = self.interpolate
+        x_name = self.x
+        y_name = self.y
 
         def extend(aggs, df, vt, bounds, plot_start=True):
             cols = info(df)
             assert cols, 'There must be at least one column on which to aggregate'
+            verts = df[[x_name, y_name]].values
             # mapped to pixels, then may be clipped
-            extend_triangles(vt, bounds, df.values, weight_type, interpolate, aggs, cols)
+            extend_triangles(vt, bounds, verts, weight_type, interpolate, aggs, cols)
 
 
         return extend
@@ -568,8 +711,15 @@ class Triangles(_PolygonLike):
 # -- Helpers for computing geometries --
 
 
+def _closure_kernel(func):
+    """Like ``ngjit``, for the kernels defined by the builders below, which
+    can then be cached on disk (see ``compiler.kernel_cache_dir``)."""
+    from .compiler import compile_closure
+    return compile_closure(func)
+
+
 def _build_map_onto_pixel_for_line(x_mapper, y_mapper):
-    @ngjit
+    @_closure_kernel
     def map_onto_pixel(vt, bounds, x, y):
         """Map points onto pixel grid.
 
@@ -608,7 +758,7 @@ def _build_map_onto_pixel_for_line(x_mapper, y_mapper):
 
 
 def _build_map_onto_pixel_for_triangle(x_mapper, y_mapper):
-    @ngjit
+    @_closure_kernel
     def map_onto_pixel(vt, bounds, x, y):
         """Map points onto pixel grid.
 
@@ -625,7 +775,7 @@ def _build_map_onto_pixel_for_triangle(x_mapper, y_mapper):
 
 def _build_draw_line(append):
     """Specialize a line plotting kernel for a given append/axis combination"""
-    @ngjit
+    @_closure_kernel
     def draw_line(x0i, y0i, x1i, y1i, i, plot_start, clipped, *aggs_and_cols):
         """Draw a line using Bresenham's algorithm
 
@@ -758,8 +908,51 @@ def _skip_or_clip(x0, x1, y0, y1, bounds, plot_start):
     return x0, x1, y0, y1, skip, clipped, plot_start
 
 
+def _sorted_rows(xs, xmin, xmax, pad=0):
+    """Return the slice of the rows of ``xs``, sorted in ascending order,
+    with values in ``[xmin, xmax]``, widened by ``pad`` rows on each side."""
+    start = max(xs.searchsorted(xmin, 'left') - pad, 0)
+    stop = min(xs.searchsorted(xmax, 'right') + pad, len(xs))
+    return slice(start, stop)
+
+
+@memoize
+def _build_decimate_rows(x_mapper):
+    @_closure_kernel
+    def decimate_rows(xs, ys, sx, tx):
+        """Return the indices of the first, last, lowest and highest vertex
+        of every run of consecutive vertices in the same pixel column.
+
+        Vertices with a ``NaN`` coordinate break the line, so they are
+        always kept and end a run.
+        """
+        n = xs.shape[0]
+        keep = np.zeros(n, dtype=np.bool_)
+        i = 0
+        while i < n:
+            if np.isnan(xs[i]) or np.isnan(ys[i]):
+                keep[i] = True
+                i += 1
+                continue
+            col = np.floor(x_mapper(xs[i]) * sx + tx)
+            imin = imax = i
+            j = i + 1
+            while (j < n and not np.isnan(xs[j]) and not np.isnan(ys[j]) and
+                   np.floor(x_mapper(xs[j]) * sx + tx) == col):
+                if ys[j] < ys[imin]:
+                    imin = j
+                if ys[j] > ys[imax]:
+                    imax = j
+                j += 1
+            keep[i] = keep[imin] = keep[imax] = keep[j - 1] = True
+            i = j
+        return np.nonzero(keep)[0]
+
+    return decimate_rows
+
+
 def _build_extend_line_axis0(draw_line, map_onto_pixel):
-    @ngjit
+    @_closure_kernel
     def extend_line(vt, bounds, xs, ys, plot_start, *aggs_and_cols):
         """Aggregate along a line formed by ``xs`` and ``ys``"""
         nrows = xs.shape[0]
@@ -784,7 +977,7 @@ def _build_extend_line_axis0(draw_line, map_onto_pixel):
 
 
 def _build_extend_line_axis0_multi(draw_line, map_onto_pixel):
-    @ngjit
+    @_closure_kernel
     def extend_line(vt, bounds, xs, ys, plot_start, *aggs_and_cols):
         """Aggregate along a line formed by ``xs`` and ``ys``"""
         nrows = xs[0].shape[0]
@@ -816,7 +1009,7 @@ def _build_extend_line_axis0_multi(draw_line, map_onto_pixel):
 
 
 def _build_extend_line_axis1_none_constant(draw_line, map_onto_pixel):
-    @ngjit
+    @_closure_kernel
     def extend_line(vt, bounds, xs, ys, plot_start, *aggs_and_cols):
         """
         here xs and ys are tuples of arrays and non-empty
@@ -850,7 +1043,7 @@ def _build_extend_line_axis1_none_constant(draw_line, map_onto_pixel):
 
 
 def _build_extend_line_axis1_x_constant(draw_line, map_onto_pixel):
-    @ngjit
+    @_closure_kernel
     def extend_line(vt, bounds, xs, ys, plot_start, *aggs_and_cols):
         """
         here xs and ys are tuples of arrays and non-empty
@@ -884,7 +1077,7 @@ def _build_extend_line_axis1_x_constant(draw_line, map_onto_pixel):
 
 
 def _build_extend_line_axis1_y_constant(draw_line, map_onto_pixel):
-    @ngjit
+    @_closure_kernel
     def extend_line(vt, bounds, xs, ys, plot_start, *aggs_and_cols):
         """
         here xs and ys are tuples of arrays and non-empty
@@ -995,11 +1188,11 @@ def _build_extend_line_axis1_ragged(draw_line, map_onto_pixel):
 
 def _build_draw_triangle(append):
     """Specialize a triangle plotting kernel for a given append/axis combination"""
-    @ngjit
+    @_closure_kernel
     def edge_func(ax, ay, bx, by, cx, cy):
         return (cx - ax) * (by - ay) - (cy - ay) * (bx - ax)
 
-    @ngjit
+    @_closure_kernel
     def draw_triangle_interp(verts, bbox, biases, aggs, weights):
         """Same as `draw_triangle()`, but with weights interpolated from vertex
         values.
@@ -1022,7 +1215,7 @@ def _build_draw_triangle(append):
                         interp_res = (g0 * w0 + g1 * w1 + g2 * w2) / area
                         append(i, j, aggs, interp_res)
 
-    @ngjit
+    @_closure_kernel
     def draw_triangle(verts, bbox, biases, aggs, val):
         """Draw a triangle on a grid.
 
@@ -1049,7 +1242,7 @@ def _build_draw_triangle(append):
 
 
 def _build_extend_triangles(draw_triangle, draw_triangle_interp, map_onto_pixel):
-    @ngjit
+    @_closure_kernel
     def extend_triangles(vt, bounds, verts, weight_type, interpolate, aggs, cols):
         """Aggregate along an array of triangles formed by arrays of CW
         vertices. Each row corresponds to a single triangle definition.
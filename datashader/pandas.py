@@ -1,32 +1,63 @@
 from __future__ import absolute_import, division
 
+from multiprocessing.pool import ThreadPool
+
+import numpy as np
 import pandas as pd
+from toolz import memoize
 
-from .core import bypixel
+from .core import bypixel, _view_transforms
 from .compiler import compile_components
-from .glyphs import _PointLike
-from .utils import Dispatcher
+from .glyphs import _PointLike, LineAxis0, LineAxis0Multi, Triangles
+from .utils import ArrayColumns, Dispatcher
 
 __all__ = ()
 
 
-@bypixel.pipeline.register(pd.DataFrame)
+@bypixel.pipeline.register((pd.DataFrame, ArrayColumns))
 def pandas_pipeline(df, schema, canvas, glyph, summary):
     return glyph_dispatch(glyph, df, schema, canvas, summary)
 
 
+@bypixel.extend.register((pd.DataFrame, ArrayColumns))
+def pandas_extend(df, schema, canvas, glyph, summary, bases, **kwargs):
+    return extend_bases(glyph, df, schema, canvas, summary, canvas.x_range,
+                        canvas.y_range, bases, **kwargs)
+
+
+@bypixel.multi.register((pd.DataFrame, ArrayColumns))
+def pandas_multi(df, schema, canvases, glyph, summary):
+    finalize = compile_components(summary, schema, glyph)[4]
+    x_bounds = y_bounds = None
+    if any(c.x_range is None or c.y_range is None for c in canvases):
+        x_bounds, y_bounds = glyph.compute_bounds(df)
+    views = _view_transforms(canvases, x_bounds, y_bounds)
+
+    views_bases = extend_multi_bases(glyph, df, schema, canvases, summary,
+                                     views)
+    return [finalize(bases, coords=coords,
+                     dims=[glyph.y_label, glyph.x_label])
+            for (bases, (_, _, _, coords)) in zip(views_bases, views)]
+
+
+@bypixel.extend_multi.register((pd.DataFrame, ArrayColumns))
+def pandas_extend_multi(df, schema, canvases, glyph, summary):
+    return extend_multi_bases(glyph, df, schema, canvases, summary,
+                              _view_transforms(canvases))
+
+
 glyph_dispatch = Dispatcher()
 
 
 @glyph_dispatch.register(_PointLike)
 def pointlike(glyph, df, schema, canvas, summary):
-    create, info, append, _, finalize = compile_components(summary, schema, glyph)
-    x_mapper = canvas.x_axis.mapper
-    y_mapper = canvas.y_axis.mapper
-    extend = glyph._build_extend(x_mapper, y_mapper, info, append)
+    finalize = compile_components(summary, schema, glyph)[4]
 
-    x_range = canvas.x_range or glyph.compute_x_bounds(df)
-    y_range = canvas.y_range or glyph.compute_y_bounds(df)
+    x_range, y_range = canvas.x_range, canvas.y_range
+    if not x_range or not y_range:
+        x_bounds, y_bounds = glyph.compute_bounds(df)
+        x_range = x_range or x_bounds
+        y_range = y_range or y_bounds
 
     width = canvas.plot_width
     height = canvas.plot_height
@@ -37,9 +68,135 @@ def pointlike(glyph, df, schema, canvas, summary):
     x_axis = canvas.x_axis.compute_index(x_st, width)
     y_axis = canvas.y_axis.compute_index(y_st, height)
 
-    bases = create((height, width))
-    extend(bases, df, x_st + y_st, x_range + y_range)
+    bases = extend_bases(glyph, df, schema, canvas, summary, x_range, y_range)
 
     return finalize(bases,
                     coords=[y_axis, x_axis],
                     dims=[glyph.y_label, glyph.x_label])
+
+
+def extend_bases(glyph, df, schema, canvas, summary, x_range, y_range,
+                 bases=None, **kwargs):
+    """Aggregate ``df`` into ``bases``, or into new bases if None.
+
+    Returns the updated bases, which may be new arrays when aggregating on
+    several threads.
+    """
+    create, info, append, combine, _ = \
+        compile_components(summary, schema, glyph)
+    x_mapper = canvas.x_axis.mapper
+    y_mapper = canvas.y_axis.mapper
+    extend = glyph._build_extend(x_mapper, y_mapper, info, append)
+
+    width = canvas.plot_width
+    height = canvas.plot_height
+
+    x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+    vt = x_st + y_st
+    # Always float, so that integer ranges don't compile new kernels
+    bounds = tuple(float(b) for b in x_range + y_range)
+
+    if canvas.threads > 1:
+        aggs = threaded_extend(glyph, create, extend, combine, df,
+                               (height, width), vt, bounds, canvas.threads,
+                               **kwargs)
+        return aggs if bases is None else combine([bases, aggs])
+
+    if bases is None:
+        bases = create((height, width))
+    extend(bases, df, vt, bounds, **kwargs)
+    return bases
+
+
+def extend_multi_bases(glyph, df, schema, canvases, summary, views,
+                       views_bases=None, threads=None):
+    """Aggregate ``df`` into the bases of every view of a ``Canvas.multi``
+    aggregation in one pass, or into new bases if ``views_bases`` is None.
+
+    ``views`` holds the ``(shape, vt, bounds, coords)`` of every canvas.
+    ``threads`` defaults to the ``threads`` of the first canvas. Returns the
+    list of updated bases, one tuple per view.
+    """
+    create, info, append, combine, _ = \
+        compile_components(summary, schema, glyph)
+    canvas = canvases[0]
+    threads = threads or canvas.threads
+    extend = glyph._build_multi_extend(canvas.x_axis.mapper,
+                                       canvas.y_axis.mapper, info, append)
+    shapes = [shape for (shape, _, _, _) in views]
+    vts = np.array([vt for (_, vt, _, _) in views], dtype='f8')
+    bounds = np.array([b for (_, _, b, _) in views], dtype='f8')
+
+    def chunk(args):
+        start, stop, _ = args
+        aggs = [create(shape) for shape in shapes]
+        extend(aggs, df.iloc[start:stop], vts, bounds)
+        return aggs
+
+    if views_bases is not None and threads == 1:
+        extend(views_bases, df, vts, bounds)
+        return views_bases
+
+    chunks = _row_chunks(glyph, len(df), threads)
+    if len(chunks) < 2:
+        aggs = chunk((0, len(df), True))
+    else:
+        results = _thread_pool(threads).map(chunk, chunks)
+        aggs = [combine(list(bs)) for bs in zip(*results)]
+    if views_bases is None:
+        return aggs
+    return [combine([b, a]) for (b, a) in zip(views_bases, aggs)]
+
+
+@memoize
+def _thread_pool(threads):
+    return ThreadPool(threads)
+
+
+def _row_chunks(glyph, nrows, nchunks, plot_start=True):
+    """Split ``nrows`` rows into at most ``nchunks`` contiguous ranges.
+
+    Returns a list of ``(start, stop, plot_start)`` tuples. Consecutive
+    ranges of connected lines overlap by one row, so that the segment joining
+    them is drawn exactly once, and triangle ranges never split the three
+    vertex rows of a single triangle.
+    """
+    align = 3 if isinstance(glyph, Triangles) else 1
+    edges = np.linspace(0, nrows // align, nchunks + 1).astype(int) * align
+    edges[-1] = nrows
+    edges = np.unique(edges)
+    connected = isinstance(glyph, (LineAxis0, LineAxis0Multi))
+    chunks = []
+    for i, (start, stop) in enumerate(zip(edges[:-1], edges[1:])):
+        if connected and i > 0:
+            chunks.append((start - 1, stop, False))
+        else:
+            chunks.append((start, stop, plot_start))
+    return chunks
+
+
+def threaded_extend(glyph, create, extend, combine, df, shape, vt, bounds,
+                    threads, plot_start=True):
+    """Aggregate ``df`` using ``threads`` threads.
+
+    The rows are split into contiguous chunks, each of which is aggregated
+    into its own private bases by the (GIL releasing) extend kernel. The
+    per-chunk bases are then merged with ``combine``.
+    """
+    chunks = _row_chunks(glyph, len(df), threads, plot_start)
+    connected = isinstance(glyph, (LineAxis0, LineAxis0Multi))
+
+    def chunk(args):
+        start, stop, plot_start = args
+        aggs = create(shape)
+        part = df.iloc[start:stop]
+        if connected:
+            extend(aggs, part, vt, bounds, plot_start=plot_start)
+        else:
+            extend(aggs, part, vt, bounds)
+        return aggs
+
+    if len(chunks) < 2:
+        return chunk((0, len(df), plot_start))
+    return combine(_thread_pool(threads).map(chunk, chunks))
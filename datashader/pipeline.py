@@ -39,10 +39,14 @@ class Pipeline(object):
         Factor by which to scale the provided height
     width_scale: float, optional
         Factor by which to scale the provided width
+    cache : AggregateCache or bool, optional
+        Cache of the aggregates, so that repeated views (e.g. after resetting
+        the zoom) are not aggregated again. True uses a new
+        ``AggregateCache`` for this pipeline. Default is False (no caching).
     """
     def __init__(self, df, glyph, agg=reductions.count(),
                  transform_fn=identity, color_fn=tf.shade, spread_fn=tf.dynspread,
-                 width_scale=1.0, height_scale=1.0):
+                 width_scale=1.0, height_scale=1.0, cache=False):
         self.df = df
         self.glyph = glyph
         self.agg = agg
@@ -51,6 +55,11 @@ class Pipeline(object):
         self.spread_fn = spread_fn
         self.width_scale = width_scale
         self.height_scale = height_scale
+        if cache is True:
+            cache = core.AggregateCache()
+        elif cache is False:
+            cache = None
+        self.cache = cache
 
     def __call__(self, x_range=None, y_range=None, width=600, height=600):
         """Compute an image from the specified pipeline.
@@ -65,7 +74,8 @@ class Pipeline(object):
         """
         canvas = core.Canvas(plot_width=int(width*self.width_scale),
                              plot_height=int(height*self.height_scale),
-                             x_range=x_range, y_range=y_range)
+                             x_range=x_range, y_range=y_range,
+                             cache=self.cache)
         bins = core.bypixel(self.df, canvas, self.glyph, self.agg)
         img = self.color_fn(self.transform_fn(bins))
         return self.spread_fn(img)
@@ -33,8 +33,18 @@ class category_codes(Preprocess):
 
 class Reduction(Expr):
     """Base class for per-bin reductions."""
-    def __init__(self, column=None):
+    # Whether the bases are linear in the data, so that they can be decayed
+    # by multiplying them with a factor (see ``_decay``)
+    _decayable = False
+    # Kinds of numpy dtypes accepted for the ``dtype`` argument
+    _dtype_kinds = ''
+
+    def __init__(self, column=None, dtype=None):
         self.column = column
+        self.dtype = _validate_dtype(self, dtype)
+
+    def _hashable_inputs(self):
+        return super(Reduction, self)._hashable_inputs() + (self.dtype,)
 
     def validate(self, in_dshape):
         if not self.column in in_dshape.dict:
@@ -43,7 +53,12 @@ class Reduction(Expr):
             raise ValueError("input must be numeric")
 
     def out_dshape(self, in_dshape):
-        return self._dshape
+        if self.dtype is None:
+            return self._dshape
+        measure = ct.CType.from_numpy_dtype(self.dtype)
+        if isinstance(self._dshape.measure, Option):
+            measure = Option(measure)
+        return dshape(measure)
 
     @property
     def inputs(self):
@@ -64,16 +79,44 @@ class Reduction(Expr):
         return self._append
 
     def _build_combine(self, dshape):
-        return self._combine
+        if self.dtype is None:
+            return self._combine
+        combine, dtype = self._combine, self.dtype
+        return lambda *aggs: combine(*aggs).astype(dtype, copy=False)
 
     def _build_finalize(self, dshape):
-        return self._finalize
+        if self.dtype is None:
+            return self._finalize
+        finalize, dtype = self._finalize, self.dtype
+
+        def cast_finalize(bases, **kwargs):
+            agg = finalize(bases, **kwargs)
+            return agg if agg.dtype == dtype else agg.astype(dtype)
+        return cast_finalize
+
+
+def _validate_dtype(reduction, dtype):
+    if dtype is None:
+        return None
+    dtype = np.dtype(dtype)
+    if dtype.kind not in reduction._dtype_kinds:
+        raise ValueError('dtype {0} is not supported by {1}'.format(
+            dtype, type(reduction).__name__))
+    return dtype
+
+
+def _saturating_sum(aggs, dtype):
+    """Sum integer ``aggs`` along the first axis, saturating at the maximum
+    value of ``dtype`` instead of overflowing."""
+    total = aggs.sum(axis=0, dtype='u8' if dtype.kind == 'u' else 'i8')
+    return np.minimum(total, np.iinfo(dtype).max).astype(dtype)
 
 
 class OptionalFieldReduction(Reduction):
     """Base class for things like ``count`` or ``any``"""
-    def __init__(self, column=None):
+    def __init__(self, column=None, dtype=None):
         self.column = column
+        self.dtype = _validate_dtype(self, dtype)
 
     @property
     def inputs(self):
@@ -98,8 +141,15 @@ class count(OptionalFieldReduction):
     column : str, optional
         If provided, only counts elements in ``column`` that are not ``NaN``.
         Otherwise, counts every element.
+    dtype : str or numpy.dtype, optional
+        Integer or floating point dtype of the counts. Default is int32.
+        Integer counts of an explicit ``dtype`` saturate at its largest value
+        rather than wrapping around, so e.g. ``'uint16'`` can be used to
+        reduce memory for large canvases.
     """
     _dshape = dshape(ct.int32)
+    _decayable = True
+    _dtype_kinds = 'iuf'
 
     @staticmethod
     @ngjit
@@ -116,9 +166,56 @@ class count(OptionalFieldReduction):
     def _create(shape):
         return np.zeros(shape, dtype='i4')
 
+    def _build_create(self, dshape):
+        if self.dtype is None:
+            return self._create
+        dtype = self.dtype
+        return lambda shape: np.zeros(shape, dtype=dtype)
+
+    def _build_append(self, dshape):
+        if self.dtype is None or self.dtype.kind == 'f':
+            return super(count, self)._build_append(dshape)
+        limit = np.iinfo(self.dtype).max
+
+        if self.column is None:
+            @ngjit
+            def _append(x, y, agg):
+                if agg[y, x] < limit:
+                    agg[y, x] += 1
+        else:
+            @ngjit
+            def _append(x, y, agg, field):
+                if not np.isnan(field) and agg[y, x] < limit:
+                    agg[y, x] += 1
+        return _append
+
     @staticmethod
     def _combine(aggs):
-        return aggs.sum(axis=0, dtype='i4')
+        return aggs.sum(axis=0, dtype=aggs.dtype)
+
+    def _build_combine(self, dshape):
+        if self.dtype is None or self.dtype.kind == 'f':
+            return self._combine
+        dtype = self.dtype
+        return lambda aggs: _saturating_sum(aggs, dtype)
+
+    @staticmethod
+    def _decay(bases, factor):
+        agg = bases[0]
+        if agg.dtype.kind != 'f':
+            # Decayed counts are fractional
+            agg = agg.astype('f8')
+        agg *= factor
+        return (agg,)
+
+    @staticmethod
+    def _finalize(bases, **kwargs):
+        agg = bases[0]
+        if agg.dtype.kind == 'f':
+            # Decayed counts mark empty bins with NaN, like other floating
+            # point aggregates
+            agg = np.where(agg == 0, np.nan, agg)
+        return xr.DataArray(agg, **kwargs)
 
 
 class any(OptionalFieldReduction):
@@ -154,11 +251,18 @@ class any(OptionalFieldReduction):
 class FloatingReduction(Reduction):
     """Base classes for reductions that always have floating-point dtype."""
     _dshape = dshape(Option(ct.float64))
+    _dtype_kinds = 'f'
 
     @staticmethod
     def _create(shape):
         return np.full(shape, np.nan, dtype='f8')
 
+    def _build_create(self, dshape):
+        if self.dtype is None:
+            return self._create
+        dtype = self.dtype
+        return lambda shape: np.full(shape, np.nan, dtype=dtype)
+
     @staticmethod
     def _finalize(bases, **kwargs):
         return xr.DataArray(bases[0], **kwargs)
@@ -172,7 +276,12 @@ class sum(FloatingReduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
+    _decayable = True
+
     @staticmethod
     @ngjit
     def _append(x, y, agg, field):
@@ -189,6 +298,12 @@ class sum(FloatingReduction):
         set_to_zero = missing_vals & ~all_empty
         return np.where(set_to_zero, 0, aggs).sum(axis=0)
 
+    @staticmethod
+    def _decay(bases, factor):
+        agg = bases[0]
+        agg *= factor
+        return (agg,)
+
 
 class m2(FloatingReduction):
     """Sum of square differences from the mean of all elements in ``column``.
@@ -201,10 +316,13 @@ class m2(FloatingReduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
     @property
     def _temps(self):
-        return (sum(self.column), count(self.column))
+        return (sum(self.column, self.dtype), count(self.column))
 
     @staticmethod
     @ngjit
@@ -234,6 +352,9 @@ class min(FloatingReduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
     @staticmethod
     @ngjit
@@ -256,6 +377,9 @@ class max(FloatingReduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
     @staticmethod
     @ngjit
@@ -279,34 +403,97 @@ class count_cat(Reduction):
         Name of the column to aggregate over. Column data type must be
         categorical. Resulting aggregate has a outer dimension axis along the
         categories present.
+    dtype : str or numpy.dtype, optional
+        Integer dtype of the counts. Default is int32. Counts of an explicit
+        ``dtype`` saturate at its largest value rather than wrapping around.
+    slots : int, optional
+        If provided, the counts are kept in a sparse store of at most
+        ``slots`` categories per bin, rather than in a dense array of all the
+        categories, which saves memory for columns with many categories.
+        Bins with at most ``slots`` categories are counted exactly. In bins
+        with more, the slots keep the most frequent categories (as in the
+        Misra-Gries algorithm): every category with more than
+        ``1 / (slots + 1)`` of the elements of the bin is kept, with a count
+        that is low by at most that share, and the elements not accounted
+        for are counted in a last, overflow slot. The resulting aggregate
+        has an outer ``slot`` dimension, with the category codes of the
+        counts (in ascending order, and ``-1`` for empty and overflow slots)
+        as a ``column`` coordinate and the category names in its
+        ``categories`` attribute.
     """
+    _dtype_kinds = 'iu'
+
+    def __init__(self, column, dtype=None, slots=None):
+        super(count_cat, self).__init__(column, dtype)
+        if slots is not None and slots < 1:
+            raise ValueError('slots must be a positive integer')
+        self.slots = slots
+
+    def _hashable_inputs(self):
+        return super(count_cat, self)._hashable_inputs() + (self.slots,)
+
     def validate(self, in_dshape):
         if not isinstance(in_dshape.measure[self.column], ct.Categorical):
             raise ValueError("input must be categorical")
 
     def out_dshape(self, input_dshape):
         cats = input_dshape.measure[self.column].categories
-        return dshape(Record([(c, ct.int32) for c in cats]))
+        typ = (ct.int32 if self.dtype is None else
+               ct.CType.from_numpy_dtype(self.dtype))
+        return dshape(Record([(c, typ) for c in cats]))
 
     @property
     def inputs(self):
         return (category_codes(self.column),)
 
     def _build_create(self, out_dshape):
+        if self.slots is not None:
+            n_slots = self.slots + 1
+            return lambda shape: np.zeros(shape + (n_slots,), dtype='i8')
         n_cats = len(out_dshape.measure.fields)
-        return lambda shape: np.zeros(shape + (n_cats,), dtype='i4')
+        dtype = 'i4' if self.dtype is None else self.dtype
+        return lambda shape: np.zeros(shape + (n_cats,), dtype=dtype)
 
     @staticmethod
     @ngjit
     def _append(x, y, agg, field):
         agg[y, x, field] += 1
 
+    @staticmethod
+    @ngjit
+    def _append_sparse(x, y, agg, field):
+        if field >= 0:
+            _insert_slot(agg, y, x, np.int64(field) + 1, 1)
+
+    def _build_append(self, dshape):
+        if self.slots is not None:
+            return self._append_sparse
+        if self.dtype is None:
+            return self._append
+        limit = np.iinfo(self.dtype).max
+
+        @ngjit
+        def _append(x, y, agg, field):
+            if agg[y, x, field] < limit:
+                agg[y, x, field] += 1
+        return _append
+
     @staticmethod
     def _combine(aggs):
         return aggs.sum(axis=0, dtype='i4')
 
+    def _build_combine(self, dshape):
+        if self.slots is not None:
+            return _merge_slots
+        if self.dtype is None:
+            return self._combine
+        dtype = self.dtype
+        return lambda aggs: _saturating_sum(aggs, dtype)
+
     def _build_finalize(self, dshape):
         cats = list(dshape[self.column].categories)
+        if self.slots is not None:
+            return self._build_finalize_sparse(cats)
 
         def finalize(bases, **kwargs):
             dims = kwargs['dims'] + [self.column]
@@ -314,6 +501,91 @@ class count_cat(Reduction):
             return xr.DataArray(bases[0], dims=dims, coords=coords)
         return finalize
 
+    def _build_finalize_sparse(self, cats):
+        dtype = np.dtype('i4') if self.dtype is None else self.dtype
+        limit = np.iinfo(dtype).max
+
+        def finalize(bases, **kwargs):
+            slots = bases[0]
+            codes = ((slots >> 32) - 1).astype('i4')
+            counts = slots & _SLOT_COUNT
+            # The overflow slot holds a plain count
+            counts[..., -1] = slots[..., -1]
+            if self.dtype is not None:
+                counts = np.minimum(counts, limit)
+            dims = kwargs['dims'] + ['slot']
+            coords = dict(zip(kwargs['dims'], kwargs['coords']))
+            coords[self.column] = (dims, codes)
+            return xr.DataArray(counts.astype(dtype), dims=dims,
+                                coords=coords, attrs={'categories': cats})
+        return finalize
+
+
+# Slots of sparse ``count_cat`` aggregates hold ``(code + 1) << 32 | count``
+# in ascending order of code, or 0 when empty; the last slot of every bin
+# holds the overflow count, so that the slots of a bin always add up to its
+# number of elements.
+_SLOT_COUNT = 0xffffffff
+
+
+@ngjit
+def _insert_slot(agg, y, x, key, count):
+    """Add ``count`` elements of the category ``key`` (code + 1) to the slots
+    of bin ``(y, x)`` of ``agg``.
+
+    If the slots are full with other categories, the counts of all of them
+    and of ``key`` are lowered by the smallest one, which moves to the
+    overflow slot, and the slots whose count drops to zero are freed for
+    what is left of ``count``."""
+    n = agg.shape[2] - 1
+    while count > 0:
+        j = 0
+        while j < n and agg[y, x, j] != 0 and (agg[y, x, j] >> 32) < key:
+            j += 1
+        if j < n and (agg[y, x, j] >> 32) == key:
+            total = (agg[y, x, j] & _SLOT_COUNT) + count
+            if total > _SLOT_COUNT:
+                total = _SLOT_COUNT
+            agg[y, x, j] = (key << 32) | total
+            return
+        if agg[y, x, n - 1] == 0:
+            for k in range(n - 1, j, -1):
+                agg[y, x, k] = agg[y, x, k - 1]
+            agg[y, x, j] = (key << 32) | count
+            return
+        dec = count
+        for k in range(n):
+            if (agg[y, x, k] & _SLOT_COUNT) < dec:
+                dec = agg[y, x, k] & _SLOT_COUNT
+        agg[y, x, n] += dec * (n + 1)
+        count -= dec
+        i = 0
+        for k in range(n):
+            slot = agg[y, x, k] - dec
+            if slot & _SLOT_COUNT:
+                agg[y, x, i] = slot
+                i += 1
+        for k in range(i, n):
+            agg[y, x, k] = 0
+
+
+@ngjit
+def _merge_slots(aggs):
+    """Combine stacked sparse ``count_cat`` aggregates."""
+    out = aggs[0].copy()
+    n = aggs.shape[3] - 1
+    for k in range(1, aggs.shape[0]):
+        for y in range(aggs.shape[1]):
+            for x in range(aggs.shape[2]):
+                # Slots are filled from the first one
+                for j in range(n):
+                    slot = aggs[k, y, x, j]
+                    if slot == 0:
+                        break
+                    _insert_slot(out, y, x, slot >> 32, slot & _SLOT_COUNT)
+                out[y, x, n] += aggs[k, y, x, n]
+    return out
+
 
 class mean(Reduction):
     """Mean of all elements in ``column``.
@@ -323,12 +595,16 @@ class mean(Reduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
     _dshape = dshape(Option(ct.float64))
+    _dtype_kinds = 'f'
 
     @property
     def _bases(self):
-        return (sum(self.column), count(self.column))
+        return (sum(self.column, self.dtype), count(self.column))
 
     @staticmethod
     def _finalize(bases, **kwargs):
@@ -346,12 +622,17 @@ class var(Reduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
     _dshape = dshape(Option(ct.float64))
+    _dtype_kinds = 'f'
 
     @property
     def _bases(self):
-        return (sum(self.column), count(self.column), m2(self.column))
+        return (sum(self.column, self.dtype), count(self.column),
+                m2(self.column, self.dtype))
 
     @staticmethod
     def _finalize(bases, **kwargs):
@@ -369,12 +650,17 @@ class std(Reduction):
     column : str
         Name of the column to aggregate over. Column data type must be numeric.
         ``NaN`` values in the column are skipped.
+    dtype : str or numpy.dtype, optional
+        Floating point dtype of the aggregate. Default is float64; float32
+        halves the memory used, at the cost of precision.
     """
     _dshape = dshape(Option(ct.float64))
+    _dtype_kinds = 'f'
 
     @property
     def _bases(self):
-        return (sum(self.column), count(self.column), m2(self.column))
+        return (sum(self.column, self.dtype), count(self.column),
+                m2(self.column, self.dtype))
 
     @staticmethod
     def _finalize(bases, **kwargs):
@@ -0,0 +1,159 @@
+from __future__ import absolute_import, division
+
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+from six import string_types
+
+from .core import Accumulator
+
+__all__ = ['StreamingCanvas']
+
+
+class StreamingCanvas(object):
+    """Aggregate a stream of micro-batches over tumbling or sliding windows.
+
+    The stream is divided into panes of length ``slide``, each aggregated
+    into its own ``Accumulator``. The last ``window / slide`` panes are kept
+    in a ring buffer, and the aggregate of the current window is computed by
+    combining the bases of the live panes, without rescanning any data. A
+    tumbling window is the special case ``slide == window``.
+
+    Panes are either defined by the values of a ``time`` column, in which
+    case rows are assigned to the pane containing their timestamp, or (if
+    ``time`` is None) by counting the batches passed to ``extend``.
+
+    Parameters
+    ----------
+    canvas : Canvas
+        The canvas to aggregate onto. Both ``x_range`` and ``y_range`` must be
+        set.
+    glyph : Glyph
+    agg : Reduction
+    window : number or timedelta-like
+        The length of the window, in units of ``time`` (or in batches when
+        ``time`` is None). Must be a multiple of ``slide``, and
+        timedelta-like (e.g. a ``datetime.timedelta`` or a string like
+        ``'10min'``) for a datetime ``time`` column.
+    slide : number or timedelta-like, optional
+        The distance between the starts of consecutive windows. Defaults to
+        ``window``, i.e. tumbling windows.
+    time : str, optional
+        Name of a numeric or datetime column assigning rows to panes. Panes
+        are aligned on multiples of ``slide`` (from the epoch for datetimes).
+        Rows older than the current window are dropped.
+
+    Examples
+    --------
+    >>> import datashader as ds  # doctest: +SKIP
+    ... cvs = ds.Canvas(x_range=(0, 1), y_range=(0, 1))
+    ... stream = ds.StreamingCanvas(cvs, ds.Point('x', 'y'), ds.count(),
+    ...                             window='10min', slide='1min',
+    ...                             time='timestamp')
+    ... for batch in batches:
+    ...     agg = stream.extend(batch).finalize()
+    """
+    def __init__(self, canvas, glyph, agg, window, slide=None, time=None):
+        if slide is None:
+            slide = window
+        if time is not None and (_timedelta_like(window) or
+                                 _timedelta_like(slide)):
+            window, slide = pd.Timedelta(window), pd.Timedelta(slide)
+        npanes = window / slide
+        if npanes < 1 or npanes != int(npanes):
+            raise ValueError('window must be a positive multiple of slide')
+        self.canvas = canvas
+        self.glyph = glyph
+        self.agg = agg
+        self.window = window
+        self.slide = slide
+        self.time = time
+        self.npanes = int(npanes)
+        self.schema = None
+        # Ring buffer of panes, indexed by pane number modulo npanes
+        self._panes = [None] * self.npanes
+        self._pane_ids = [None] * self.npanes
+        self._head = None
+        self._nbatches = 0
+
+    @property
+    def pane_ids(self):
+        """Sorted numbers of the panes in the current window."""
+        return sorted(p for p in self._pane_ids if p is not None)
+
+    def extend(self, source):
+        """Aggregate a batch of rows into the panes of the stream.
+
+        Parameters
+        ----------
+        source : pandas.DataFrame
+            The micro-batch to aggregate.
+
+        Returns
+        -------
+        self : StreamingCanvas
+        """
+        if self.time is None:
+            self._extend_pane(self._nbatches // self.slide, source)
+            self._nbatches += 1
+            return self
+
+        ids = self._time_pane_ids(source[self.time].values)
+        for pane_id in np.unique(ids[ids >= 0]):
+            self._extend_pane(pane_id, source[ids == pane_id])
+        return self
+
+    def _time_pane_ids(self, times):
+        """Map times onto pane numbers, using -1 for missing times"""
+        datetimes = np.issubdtype(times.dtype, np.datetime64)
+        if datetimes != isinstance(self.slide, pd.Timedelta):
+            raise ValueError('window and slide must be {0} for the {1} time '
+                             'column {2!r}, got {3!r}'.format(
+                                 'timedelta-like' if datetimes else 'numbers',
+                                 times.dtype, self.time, self.window))
+        if datetimes:
+            missing = np.isnat(times)
+            times = times.astype('M8[ns]').astype('i8')
+            step = self.slide.value
+        else:
+            missing = np.isnan(times)
+            step = self.slide
+        ids = np.floor_divide(np.where(missing, 0, times), step)
+        return np.where(missing, -1, ids).astype('i8')
+
+    def _extend_pane(self, pane_id, source):
+        if self._head is None or pane_id > self._head:
+            self._head = pane_id
+        elif pane_id <= self._head - self.npanes:
+            # Too old to fall within the current window
+            return
+        slot = pane_id % self.npanes
+        if self._pane_ids[slot] != pane_id:
+            self._panes[slot] = Accumulator(self.canvas, self.glyph, self.agg)
+            self._pane_ids[slot] = pane_id
+        self._panes[slot].extend(source)
+        if self.schema is None:
+            self.schema = self._panes[slot].schema
+
+    def _live_panes(self):
+        if self._head is None:
+            return []
+        oldest = self._head - self.npanes + 1
+        return [pane for (pane_id, pane) in zip(self._pane_ids, self._panes)
+                if pane_id is not None and pane_id >= oldest]
+
+    def finalize(self):
+        """Return the aggregate of the current window.
+
+        Returns
+        -------
+        aggregate : xarray.DataArray or xarray.Dataset
+        """
+        window = Accumulator(self.canvas, self.glyph, self.agg)
+        window.schema = self.schema
+        return window.combine(*self._live_panes()).finalize()
+
+
+def _timedelta_like(value):
+    return isinstance(value, string_types + (timedelta, np.timedelta64))
@@ -0,0 +1,105 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+import datashader as ds
+from datashader import compiler
+from datashader.glyphs import Point
+from datashader.utils import dshape_from_pandas
+
+import pytest
+
+
+df = pd.DataFrame({'x': np.array([0., 0.5, 1.]),
+                   'y': np.array([0., 0.5, 1.]),
+                   'f64': np.array([1., 2., 3.])})
+schema = dshape_from_pandas(df).measure
+glyph = Point('x', 'y')
+
+# Bypass memoization, so every call generates a new append kernel. The
+# kernels are kept alive, as freeing them crashes some versions of numba.
+_kernels = []
+
+
+def compile_components(*args):
+    components = compiler.compile_components.__wrapped__(*args)
+    _kernels.append(components)
+    return components
+
+
+def kernel_sources(path):
+    return sorted(f for f in os.listdir(path) if f.endswith('.py'))
+
+
+def test_kernel_cache_disabled(monkeypatch, tmpdir):
+    monkeypatch.setattr(compiler, 'kernel_cache_dir', None)
+    append = compile_components(ds.count(), schema, glyph)[2]
+    agg = np.zeros((2, 2), dtype='i4')
+    append(0, 1, 1, agg)
+    assert agg[1, 1] == 1
+    assert append.stats.cache_path is None
+
+
+def test_kernel_cache_writes_source(monkeypatch, tmpdir):
+    monkeypatch.setattr(compiler, 'kernel_cache_dir', str(tmpdir))
+    append = compile_components(ds.sum('f64'), schema, glyph)[2]
+    agg = np.full((2, 2), np.nan)
+    append(2, 1, 1, agg, df.f64.values)
+    assert agg[1, 1] == 3
+    assert len(kernel_sources(str(tmpdir))) == 1
+
+    # Identical kernels share a module, others get their own
+    compile_components(ds.sum('f64'), schema, glyph)
+    assert len(kernel_sources(str(tmpdir))) == 1
+    compile_components(ds.max('f64'), schema, glyph)
+    assert len(kernel_sources(str(tmpdir))) == 2
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='spawns subprocesses')
+def test_kernel_cache_reused_across_processes(tmpdir):
+    script = '\n'.join([
+        'import numpy as np, pandas as pd, datashader as ds',
+        'from datashader import compiler',
+        'from datashader.utils import dshape_from_pandas',
+        "df = pd.DataFrame({'x': [0., 1.], 'y': [0., 1.]})",
+        'schema = dshape_from_pandas(df).measure',
+        "append = compiler.compile_components(ds.count(), schema,",
+        "                                     ds.Point('x', 'y'))[2]",
+        "append(0, 0, 0, np.zeros((1, 1), dtype='i4'))",
+        'print(sum(append.stats.cache_hits.values()))',
+    ])
+    env = dict(os.environ, DATASHADER_KERNEL_CACHE_DIR=str(tmpdir))
+    hits = [int(subprocess.check_output([sys.executable, '-c', script],
+                                        env=env).split()[-1])
+            for _ in range(2)]
+    assert hits == [0, 1]
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='spawns subprocesses')
+def test_extend_kernels_cached(tmpdir):
+    script = '\n'.join([
+        'import numpy as np, pandas as pd, datashader as ds',
+        "df = pd.DataFrame({'x': [0., 0.5, 1.], 'y': [0., 1., 0.5]})",
+        'cvs = ds.Canvas(plot_width=3, plot_height=3)',
+        "print(int(cvs.points(df, 'x', 'y').sum()),",
+        "      int(cvs.line(df, 'x', 'y').sum()))",
+    ])
+    env = dict(os.environ, DATASHADER_KERNEL_CACHE_DIR=str(tmpdir))
+    cache = os.path.join(str(tmpdir), '__pycache__')
+
+    def run():
+        out = subprocess.check_output([sys.executable, '-c', script], env=env)
+        mtimes = dict((f, os.path.getmtime(os.path.join(cache, f)))
+                      for f in os.listdir(cache))
+        return out.split(), mtimes
+
+    (out, mtimes), (out2, mtimes2) = run(), run()
+    assert out == out2
+    # The extend kernels (and the line kernels they call) are cached
+    # alongside the append kernels, and loaded rather than compiled again
+    index = set(f.split('.')[1] for f in mtimes if f.endswith('.nbi'))
+    assert set(['_extend-1', 'append-1', 'extend_line-1']) <= index
+    assert mtimes2 == mtimes
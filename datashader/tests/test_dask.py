@@ -1,4 +1,6 @@
 from __future__ import division
+from collections import OrderedDict
+
 from dask.context import config
 import dask.dataframe as dd
 import numpy as np
@@ -53,6 +55,13 @@ def floats(n):
         n = n + np.spacing(n)
 
 
+@pytest.fixture
+def empty_caches(monkeypatch):
+    """Replace the module-level caches with empty ones for a test."""
+    monkeypatch.setattr(ds.dask, '_bounds_cache', OrderedDict())
+    monkeypatch.setattr(ds.core, '_categories_cache', OrderedDict())
+
+
 def test_count():
     out = xr.DataArray(np.array([[5, 5], [5, 5]], dtype='i4'),
                        coords=coords, dims=dims)
@@ -149,6 +158,226 @@ def test_count_cat():
     assert_eq(agg, out)
 
 
+def test_count_cat_unknown_categories(empty_caches):
+    sol = np.array([[[5, 0, 0, 0],
+                     [0, 0, 5, 0]],
+                    [[0, 5, 0, 0],
+                     [0, 0, 0, 5]]])
+    out = xr.DataArray(sol, coords=(coords + [['a', 'b', 'c', 'd']]),
+                       dims=(dims + ['cat']))
+    # Each partition gets its own categories
+    ddf2 = dd.from_pandas(df.assign(cat=df.cat.astype(str)), npartitions=3)
+    ddf2 = ddf2.assign(cat=ddf2.cat.astype('category'))
+    assert not ddf2.cat.cat.known
+    agg = c.points(ddf2, 'x', 'y', ds.count_cat('cat'))
+    assert_eq(agg.sortby('cat'), out)
+
+    # The categories are only computed once per frame
+    assert (ddf2._name, 'cat') in ds.core._categories_cache
+    ds.core._categories_cache[(ddf2._name, 'cat')] = pd.Index(list('dcba'))
+    agg = c.points(ddf2, 'x', 'y', ds.count_cat('cat'))
+    assert list(agg.cat.values) == list('dcba')
+    assert_eq(agg.sortby('cat'), out)
+
+
+def test_dshape_from_meta():
+    def fail(df):
+        raise AssertionError('partition computed')
+
+    lazy = ddf.map_partitions(fail, meta=ddf._meta)
+    dshape = du.dshape_from_dask(lazy)
+    assert dshape.measure == du.dshape_from_pandas(df).measure
+    assert du.dshape_from_dask(lazy, ['y', 'x']).measure.names == ['y', 'x']
+
+
+def test_saturating_counts():
+    # Every partition holds 30000 points in the same bin
+    big = dd.from_pandas(pd.DataFrame({'x': np.zeros(90000),
+                                       'y': np.zeros(90000)}),
+                         npartitions=3)
+    out = c.points(big, 'x', 'y', ds.count(dtype='u2'))
+    assert out.dtype == 'u2'
+    assert out.values[0, 0] == 65535
+    out = c.points(big, 'x', 'y', ds.count(dtype='u4'))
+    assert out.values[0, 0] == 90000
+
+
+def test_multi():
+    views = [ds.Canvas(plot_width=4, plot_height=3, x_range=(0, 1),
+                       y_range=(0, 1)),
+             ds.Canvas(plot_width=3, plot_height=2)]
+    agg = ds.summary(mean=ds.mean('f64'), cats=ds.count_cat('cat'))
+    out = c.multi(ddf, 'x', 'y', agg, views=views)
+    assert len(out) == 3
+    for canvas, result in zip([c] + views, out):
+        assert result.equals(canvas.points(ddf, 'x', 'y', agg))
+
+
+def test_bounds_cache(empty_caches):
+    cvs = ds.Canvas(plot_width=2, plot_height=2)
+    glyph = ds.Point('x', 'y')
+    agg = cvs.points(ddf, 'x', 'y')
+    assert ds.dask._bounds_cache[(ddf._name, glyph)] == ((0, 1), (0, 1))
+
+    # The cached extents are used instead of reading the data again
+    ds.dask._bounds_cache[(ddf._name, glyph)] = ((-1, 1), (-1, 1))
+    assert not cvs.points(ddf, 'x', 'y').equals(agg)
+    del ds.dask._bounds_cache[(ddf._name, glyph)]
+    assert cvs.points(ddf, 'x', 'y').equals(agg)
+
+    # Least recently used extents are evicted
+    ds.dask._bounds_cache.clear()
+    with config.set({'datashader.bounds_cache_size': 1}):
+        cvs.points(ddf, 'x', 'y')
+    assert list(ds.dask._bounds_cache) == [(ddf._name, glyph)]
+
+
+@pytest.mark.parametrize('split_every,partitions_per_task',
+                         [(2, 1), (2, 2), (3, 4)])
+def test_tree_combine(split_every, partitions_per_task):
+    ddf2 = dd.from_pandas(df, npartitions=7)
+    cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(0, 1),
+                    y_range=(0, 1))
+    points = cvs.points(ddf2, 'x', 'y', ds.sum('i32'))
+    line = cvs.line(ddf2, 'x', 'y', ds.count())
+    with config.set({'datashader.split_every': split_every,
+                     'datashader.partitions_per_task': partitions_per_task}):
+        assert_eq(cvs.points(ddf2, 'x', 'y', ds.sum('i32')), points)
+        assert_eq(cvs.line(ddf2, 'x', 'y', ds.count()), line)
+
+
+@pytest.mark.parametrize('scheduler', ['threads', 'sync'])
+def test_shared_accumulators(scheduler):
+    ddf2 = dd.from_pandas(df, npartitions=7)
+    cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(0, 1),
+                    y_range=(0, 1))
+    points = cvs.points(ddf2, 'x', 'y', ds.sum('i32'))
+    line = cvs.line(ddf2, 'x', 'y', ds.count())
+    with config.set({'scheduler': scheduler,
+                     'datashader.shared_accumulators': True}):
+        assert_eq(cvs.points(ddf2, 'x', 'y', ds.sum('i32')), points)
+        assert_eq(cvs.line(ddf2, 'x', 'y', ds.count()), line)
+
+
+def test_lazy():
+    import dask
+    import dask.array as da
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1))
+    lazy = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                     y_range=(0, 1), lazy=True)
+
+    agg = lazy.points(ddf, 'x', 'y', ds.mean('f64'))
+    assert isinstance(agg.data, da.Array)
+    assert_eq(agg.compute(), cvs.points(ddf, 'x', 'y', ds.mean('f64')))
+
+    summary = ds.summary(c=ds.count(), cats=ds.count_cat('cat'))
+    agg, line = dask.compute(lazy.points(ddf, 'x', 'y', summary),
+                             lazy.line(ddf, 'x', 'y'))
+    assert_eq(agg, cvs.points(ddf, 'x', 'y', summary))
+    assert_eq(line, cvs.line(ddf, 'x', 'y'))
+
+
+def test_lazy_shared_accumulators():
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1))
+    lazy = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                     y_range=(0, 1), lazy=True)
+
+    # Lazy graphs aggregate every partition on its own, so that computing
+    # them twice doesn't count the partitions twice
+    with config.set({'datashader.shared_accumulators': True}):
+        agg = lazy.points(ddf, 'x', 'y', ds.count())
+        sol = cvs.points(ddf, 'x', 'y', ds.count())
+        assert_eq(agg.compute(), sol)
+        assert_eq(agg.compute(), sol)
+        assert_eq(lazy.line(ddf, 'x', 'y').compute(),
+                  cvs.line(ddf, 'x', 'y'))
+
+
+def test_partition_cache():
+    cache = ds.AggregateCache(partitions=True)
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1), cache=cache)
+    assert_eq(cvs.points(ddf, 'x', 'y', ds.sum('i32')),
+              c.points(ddf, 'x', 'y', ds.sum('i32')))
+    assert cache.partition_hits == 0
+
+    # Appending a partition only aggregates the new one
+    new = df.iloc[:4].copy()
+    new.index = new.index + len(df)
+    ddf2 = dd.concat([ddf, dd.from_pandas(new, npartitions=1)])
+    agg = cvs.points(ddf2, 'x', 'y', ds.sum('i32'))
+    assert cache.partition_hits == ddf.npartitions
+    assert_eq(agg, c.points(ddf2, 'x', 'y', ds.sum('i32')))
+
+
+def test_aggregate_cache_pan():
+    cache = ds.AggregateCache()
+
+    def points(x_range, cache):
+        cvs = ds.Canvas(plot_width=4, plot_height=2, x_range=x_range,
+                        y_range=(0, 1), cache=cache)
+        return cvs.points(ddf, 'x', 'y', ds.mean('f64'))
+
+    points((0, 1), cache)
+    for x_range in [(0.25, 1.25), (-0.5, 0.5)]:
+        assert_eq(points(x_range, cache), points(x_range, None))
+    assert (cache.pans, cache.misses) == (2, 1)
+
+
+def test_prune_partitions(empty_caches):
+    df2 = df.copy()
+    df2['x'] = np.linspace(0, 10, len(df2))
+    ddf2 = dd.from_pandas(df2, npartitions=4)
+    ddf3 = ddf2.set_index('x', drop=False, sorted=True)
+    cvs = ds.Canvas(plot_width=4, plot_height=2, x_range=(0.5, 2),
+                    y_range=(0, 1))
+    glyph = ds.glyphs.Point('x', 'y')
+    schema = du.dshape_from_dask(ddf2).measure
+
+    def deps(source):
+        dsk, name, _ = ds.dask.default(glyph, source, schema, cvs,
+                                       ds.count())
+        partitions = set(source.__dask_keys__())
+        return [k for v in dsk.values() if isinstance(v, tuple)
+                for k in v[1:] if isinstance(k, tuple) and k in partitions]
+
+    # Extents aren't computed only for pruning, so without divisions every
+    # partition is aggregated until the source is auto-ranged
+    assert len(deps(ddf2)) == 4
+    assert (ddf2._name, glyph, 'partitions') not in ds.dask._bounds_cache
+    ds.Canvas(plot_width=4, plot_height=2).points(ddf2, 'x', 'y')
+    assert (ddf2._name, glyph, 'partitions') in ds.dask._bounds_cache
+
+    # Only the partitions intersecting the ranges are aggregated, by
+    # divisions or else by the cached extents of the partitions
+    for source in [ddf3, ddf2]:
+        agg = cvs.points(source, 'x', 'y', ds.sum('i32'))
+        assert_eq(agg, cvs.points(df2, 'x', 'y', ds.sum('i32')))
+        assert deps(source) == [(source._name, 0)]
+
+    # An index named after a coordinate column, but holding other values,
+    # isn't used
+    ddf5 = dd.from_pandas(df2.rename_axis('x'), npartitions=4)
+    assert ddf5.known_divisions
+    assert len(deps(ddf5)) == 4
+    assert_eq(cvs.points(ddf5, 'x', 'y', ds.sum('i32')),
+              cvs.points(df2, 'x', 'y', ds.sum('i32')))
+
+    # Nothing in range
+    cvs = ds.Canvas(plot_width=4, plot_height=2, x_range=(20, 30),
+                    y_range=(0, 1))
+    assert cvs.points(ddf2, 'x', 'y').sum() == 0
+
+    # Without prune_partitions, auto-ranging only computes the bounds
+    ddf4 = dd.from_pandas(df2, npartitions=2)
+    with config.set({'datashader.prune_partitions': False}):
+        ds.Canvas(plot_width=4, plot_height=2).points(ddf4, 'x', 'y')
+    assert (ddf4._name, glyph) in ds.dask._bounds_cache
+    assert (ddf4._name, glyph, 'partitions') not in ds.dask._bounds_cache
+
+
 def test_multiple_aggregates():
     agg = c.points(ddf, 'x', 'y',
                    ds.summary(f64_std=ds.std('f64'),
@@ -284,6 +513,29 @@ def test_line():
     assert_eq(agg, out)
 
 
+@pytest.mark.parametrize('x,y', [('x', 'y'), (['x', 'x'], ['y', 'f64'])])
+@pytest.mark.parametrize('npartitions', [3, 7])
+def test_line_partition_boundaries(x, y, npartitions):
+    df2 = df.copy()
+    df2['x'] = np.linspace(0, 1, len(df2))
+    ddf2 = dd.from_pandas(df2, npartitions=npartitions)
+    cvs = ds.Canvas(plot_width=8, plot_height=8, x_range=(0, 1),
+                    y_range=(-1, 20))
+    agg = cvs.line(ddf2, x, y, ds.count())
+    assert_eq(agg, cvs.line(df2, x, y, ds.count()))
+
+    # Chunk tasks depend on the last row of the previous partition, not on
+    # the partition itself, and every last row only on its own partition
+    glyph = ds.glyphs.LineAxis0('x', 'y')
+    schema = du.dshape_from_dask(ddf2).measure
+    dsk, name, _ = ds.dask.line(glyph, ddf2, schema, cvs, ds.count())
+    partitions = set(ddf2.__dask_keys__())
+    for i in range(npartitions):
+        deps = [k for k in dsk[(name, i)][1:] if k in partitions]
+        assert deps == [(ddf2._name, i)]
+        assert dsk[('boundary-' + name, i)][1:] == ((ddf2._name, i),)
+
+
 # # Line tests
 @pytest.mark.parametrize('df,x,y,ax', [
     # axis1 none constant
@@ -577,3 +829,43 @@ def test_trimesh_dask_partitions(npartitions):
     ], dtype='i4')
     np.testing.assert_array_equal(
         np.flipud(agg.fillna(0).astype('i4').values)[:5], sol)
+
+
+def test_precompile_from_meta():
+    glyph = ds.Point('x', 'y')
+    timings = ds.precompile(ddf._meta, [glyph], [ds.mean('f64')], shade=False)
+    assert list(timings) == [(glyph, ds.mean('f64'), 'compile'),
+                             (glyph, ds.mean('f64'), 'aggregate')]
+
+
+@pytest.mark.parametrize('source', [df, ddf])
+def test_integer_ranges(monkeypatch, source):
+    # Bounds are passed to the kernels as floats whatever the ranges and the
+    # backend, so that the kernels compiled by precompile are reused
+    bounds = []
+    build_extend = ds.glyphs.Point._build_extend
+
+    def recording_build_extend(self, *args):
+        extend = build_extend(self, *args)
+
+        def recording_extend(aggs, df, vt, b, **kwargs):
+            bounds.append(b)
+            return extend(aggs, df, vt, b, **kwargs)
+        return recording_extend
+
+    monkeypatch.setattr(ds.glyphs.Point, '_build_extend',
+                        recording_build_extend)
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1))
+    sol = ds.Canvas(plot_width=2, plot_height=2, x_range=(0., 1.),
+                    y_range=(0., 1.)).points(source, 'x', 'y')
+    assert_eq(cvs.points(source, 'x', 'y'), sol)
+    assert bounds and all(isinstance(v, float) for b in bounds for v in b)
+
+
+def test_accumulator():
+    agg = ds.mean('f64')
+    acc = ds.Accumulator(c, ds.Point('x', 'y'), agg)
+    acc.extend(ddf)
+    acc.extend(df)
+    assert_eq(acc.finalize(), c.points(pd.concat([df, df]), 'x', 'y', agg))
@@ -18,6 +18,14 @@ def test_point_bounds_check():
     assert p._compute_y_bounds(df['y'].values) == (5, 7)
 
 
+def test_point_fused_bounds():
+    df = pd.DataFrame({'x': [1, np.nan, 3], 'y': [5, 6, np.nan]})
+    p = Point('x', 'y')
+    assert p.compute_bounds(df) == (p.compute_x_bounds(df),
+                                    p.compute_y_bounds(df))
+    assert p.compute_bounds(df) == ((1, 3), (5, 6))
+
+
 def test_point_validate():
     p = Point('x', 'y')
     p.validate(dshape("{x: int32, y: float32}"))
@@ -142,6 +142,67 @@ def test_count_cat():
     assert_eq(agg, out)
 
 
+@pytest.mark.parametrize('threads', [1, 2])
+def test_count_cat_sparse(threads):
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1), threads=threads)
+    agg = cvs.points(df, 'x', 'y', ds.count_cat('cat', slots=2))
+    assert agg.dims == tuple(dims + ['slot'])
+    assert agg.attrs['categories'] == ['a', 'b', 'c', 'd']
+    sol = np.array([[[5, 0, 0], [5, 0, 0]],
+                    [[5, 0, 0], [5, 0, 0]]], dtype='i4')
+    codes = np.array([[[0, -1, -1], [2, -1, -1]],
+                      [[1, -1, -1], [3, -1, -1]]], dtype='i4')
+    np.testing.assert_equal(agg.values, sol)
+    np.testing.assert_equal(agg.coords['cat'].values, codes)
+
+    # The most frequent categories of a bin are kept, and the elements not
+    # accounted for by their counts are counted as overflow
+    cvs = ds.Canvas(plot_width=1, plot_height=1, x_range=(0, 1),
+                    y_range=(0, 1), threads=threads)
+    data = pd.DataFrame({'x': [0.5] * 4, 'y': [0.5] * 4,
+                         'cat': pd.Categorical(list('faff'),
+                                               categories=list('abcdef'))})
+    for rows in [data, data.iloc[::-1], data.iloc[[1, 0, 2, 3]]]:
+        agg = cvs.points(rows, 'x', 'y', ds.count_cat('cat', slots=1))
+        assert agg.coords['cat'].values[0, 0, 0] == 5
+        assert agg.values.sum() == 4
+
+
+def test_count_cat_sparse_heavy_hitters():
+    import datashader.transfer_functions as tf
+
+    rng = np.random.RandomState(2)
+    n = 2000
+    codes = np.where(rng.uniform(size=n) < 0.5, 9, rng.randint(0, 9, n))
+    cats = pd.Categorical.from_codes(codes, list('abcdefghij'))
+    data = pd.DataFrame({'x': rng.uniform(0, 1, n),
+                         'y': rng.uniform(0, 1, n), 'cat': cats})
+    agg = ds.count_cat('cat', slots=3)
+    dense = ds.Canvas(plot_width=3, plot_height=3).points(data, 'x', 'y',
+                                                          ds.count_cat('cat'))
+    total = dense.values.sum(axis=2)
+    shuffled = data.iloc[rng.permutation(n)]
+    for rows, threads in [(data, 1), (shuffled, 1), (shuffled, 3)]:
+        cvs = ds.Canvas(plot_width=3, plot_height=3, threads=threads)
+        out = cvs.points(rows, 'x', 'y', agg)
+        np.testing.assert_equal(out.values.sum(axis=2), total)
+        # The category of half of the elements is always kept, and the
+        # kept counts are low by at most a quarter of the bin
+        kept = out.coords['cat'].values[..., :3]
+        assert (kept == 9).any(axis=2).all()
+        for y, x, j in zip(*np.nonzero(kept >= 0)):
+            count = dense.values[y, x, kept[y, x, j]]
+            assert count - total[y, x] / 4 <= out.values[y, x, j] <= count
+
+    # With enough slots, shading matches the dense aggregate
+    colors = ['#%02x0000' % (25 * i) for i in range(10)]
+    full = ds.Canvas(plot_width=3, plot_height=3).points(
+        data, 'x', 'y', ds.count_cat('cat', slots=10))
+    assert tf.shade(full, color_key=colors).equals(
+        tf.shade(dense, color_key=colors))
+
+
 def test_multiple_aggregates():
     agg = c.points(df, 'x', 'y',
                    ds.summary(f64_std=ds.std('f64'),
@@ -314,6 +375,408 @@ def test_lines_on_edge():
     assert_eq(agg, out)
 
 
+@pytest.mark.parametrize('threads', [2, 3, 7])
+@pytest.mark.parametrize('reduction', [ds.count('f64'), ds.sum('f64'),
+                                       ds.std('f64'), ds.count_cat('cat')])
+def test_threaded_points(threads, reduction):
+    cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                    y_range=(0, 1), threads=threads)
+    assert_eq(cvs.points(df, 'x', 'y', reduction),
+              c.points(df, 'x', 'y', reduction))
+
+
+@pytest.mark.parametrize('threads', [2, 3, 7])
+def test_threaded_line(threads):
+    xs = np.linspace(-3, 3, 41)
+    ldf = pd.DataFrame({'x': xs, 'y': np.sin(3 * xs) * 3})
+    ldf.loc[17, 'y'] = np.nan
+    cvs = ds.Canvas(plot_width=9, plot_height=9,
+                    x_range=(-3, 3), y_range=(-3, 3))
+    tcvs = ds.Canvas(plot_width=9, plot_height=9,
+                     x_range=(-3, 3), y_range=(-3, 3), threads=threads)
+    assert_eq(tcvs.line(ldf, 'x', 'y', ds.count()),
+              cvs.line(ldf, 'x', 'y', ds.count()))
+    assert_eq(tcvs.line(ldf, ['x', 'x'], ['y', 'x'], ds.count()),
+              cvs.line(ldf, ['x', 'x'], ['y', 'x'], ds.count()))
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('f32'), ds.mean('f64'),
+                                 ds.count_cat('cat')])
+def test_array_sources(agg, tmpdir):
+    sol = c.points(df, 'x', 'y', agg)
+    arrays = {k: df[k].values for k in ['x', 'y', 'f32', 'f64', 'cat']}
+    assert_eq(c.points(arrays, 'x', 'y', agg), sol)
+    assert_eq(ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                        y_range=(0, 1), threads=3).points(arrays, 'x', 'y', agg),
+              sol)
+
+    if not isinstance(agg, ds.count_cat):
+        records = df[['x', 'y', 'f32', 'f64']].to_records(index=False)
+        assert_eq(c.points(records, 'x', 'y', agg), sol)
+
+        path = str(tmpdir.join('records.dat'))
+        mm = np.memmap(path, dtype=records.dtype, mode='w+',
+                       shape=records.shape)
+        mm[:] = records
+        assert_eq(c.points({k: mm[k] for k in ['x', 'y', 'f32', 'f64']},
+                           'x', 'y', agg), sol)
+
+
+def test_array_source_line():
+    xs = np.linspace(-3, 3, 41)
+    arrays = {'x': xs, 'y': np.sin(3 * xs) * 3}
+    cvs = ds.Canvas(plot_width=9, plot_height=9,
+                    x_range=(-3, 3), y_range=(-3, 3))
+    sol = cvs.line(pd.DataFrame(arrays), 'x', 'y', ds.count())
+    assert_eq(cvs.line(arrays, 'x', 'y', ds.count()), sol)
+
+    acc = ds.Accumulator(cvs, ds.glyphs.LineAxis0('x', 'y'), ds.count())
+    for batch in np.array_split(np.arange(len(xs)), 4):
+        acc.extend({k: v[batch] for k, v in arrays.items()})
+    assert_eq(acc.finalize(), sol)
+
+
+def test_array_source_errors():
+    with pytest.raises(ValueError):
+        c.points({'x': np.zeros(3), 'y': np.zeros(4)}, 'x', 'y')
+    with pytest.raises(ValueError):
+        c.points({'x': np.zeros((3, 2)), 'y': np.zeros(3)}, 'x', 'y')
+    with pytest.raises(ValueError):
+        c.points(np.zeros((3, 2)), 'x', 'y')
+
+
+def test_reduction_dtypes():
+    big = pd.DataFrame({'x': np.zeros(70000), 'y': np.zeros(70000),
+                        'f64': np.ones(70000),
+                        'cat': pd.Categorical(['a'] * 70000)})
+    out = c.points(big, 'x', 'y', ds.count(dtype='u2'))
+    assert out.dtype == 'u2'
+    assert out.values[0, 0] == 65535
+    out = c.points(big, 'x', 'y', ds.count('f64', dtype='f4'))
+    assert out.dtype == 'f4'
+    assert out.values[0, 0] == 70000
+    out = c.points(big, 'x', 'y', ds.count_cat('cat', dtype='u2'))
+    assert out.dtype == 'u2'
+    assert out.values[0, 0, 0] == 65535
+
+    for agg in [ds.sum, ds.min, ds.max, ds.mean, ds.var, ds.std]:
+        out = c.points(df, 'x', 'y', agg('f64', dtype='f4'))
+        assert out.dtype == 'f4'
+        np.testing.assert_allclose(out.values,
+                                   c.points(df, 'x', 'y', agg('f64')).values,
+                                   rtol=1e-6)
+
+    assert ds.sum('f64', dtype='f4') != ds.sum('f64')
+    with pytest.raises(ValueError):
+        ds.sum('f64', dtype='i4')
+    with pytest.raises(ValueError):
+        ds.count_cat('cat', dtype='f4')
+    with pytest.raises(ValueError):
+        ds.any(dtype='u1')
+
+
+def test_multi():
+    views = [ds.Canvas(plot_width=4, plot_height=3, x_range=(0, 1),
+                       y_range=(0, 1)),
+             ds.Canvas(plot_width=1, plot_height=1, x_range=(0.5, 2),
+                       y_range=(0.5, 2)),
+             ds.Canvas(plot_width=3, plot_height=2)]
+    agg = ds.summary(mean=ds.mean('f64'), cats=ds.count_cat('cat'))
+    for threads in [1, 3]:
+        cvs = ds.Canvas(plot_width=2, plot_height=2, x_range=(0, 1),
+                        y_range=(0, 1), threads=threads)
+        out = cvs.multi(df, 'x', 'y', agg, views=views)
+        assert len(out) == 4
+        for canvas, result in zip([cvs] + views, out):
+            assert result.equals(canvas.points(df, 'x', 'y', agg))
+    assert_eq(c.multi(df, 'x', 'y')[0], c.points(df, 'x', 'y'))
+
+    with pytest.raises(ValueError):
+        c.multi(df, 'x', 'y', views=[c_logx])
+
+
+def test_pyramid():
+    cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(0, 1),
+                    y_range=(0, 1))
+    agg = ds.summary(count=ds.count('f64'), var=ds.var('f64'),
+                     min=ds.min('f64'), cats=ds.count_cat('cat'))
+    out = cvs.pyramid(df, ds.Point('x', 'y'), agg, levels=3)
+    assert len(out) == 3
+    for size, result in zip([4, 2, 1], out):
+        expected = ds.Canvas(plot_width=size, plot_height=size,
+                             x_range=(0, 1), y_range=(0, 1)).points(
+                                 df, 'x', 'y', agg)
+        assert result['count'].equals(expected['count'])
+        assert result.cats.equals(expected.cats)
+        assert result['min'].equals(expected['min'])
+        np.testing.assert_allclose(result['var'].values,
+                                   expected['var'].values)
+        for dim in ['x', 'y']:
+            np.testing.assert_allclose(result[dim].values,
+                                       expected[dim].values)
+
+    with pytest.raises(ValueError):
+        cvs.pyramid(df, ds.Point('x', 'y'), levels=4)
+    with pytest.raises(ValueError):
+        ds.Canvas(plot_width=4, plot_height=4).pyramid(df, ds.Point('x', 'y'))
+
+
+def test_aggregate_cache():
+    cache = ds.AggregateCache()
+    agg = ds.summary(count=ds.count('f64'), mean=ds.mean('f64'),
+                     cats=ds.count_cat('cat'))
+
+    def canvas(width, x_range=(0, 1), y_range=(0, 1), cache=cache):
+        return ds.Canvas(plot_width=width, plot_height=width,
+                         x_range=x_range, y_range=y_range, cache=cache)
+
+    def check(cvs, hits, misses):
+        out = cvs.points(df, 'x', 'y', agg)
+        expected = canvas(cvs.plot_width, cvs.x_range, cvs.y_range,
+                          None).points(df, 'x', 'y', agg)
+        assert out.equals(expected)
+        assert (cache.hits, cache.misses) == (hits, misses)
+
+    check(canvas(4), 0, 1)
+    check(canvas(4), 1, 1)
+    # Integer subsampling and crop of the cached 4x4 grid
+    check(canvas(2), 2, 1)
+    check(canvas(1), 3, 1)
+    check(canvas(2, (0.5, 1), (0.5, 1)), 4, 1)
+    # Crops ending inside the cached grid, whose points on the upper edges
+    # are in the pixels above them
+    check(canvas(2, (0, 0.5), (0, 0.5)), 4, 2)
+    # Pixels not aligned with the cached grid
+    check(canvas(3), 4, 3)
+    check(canvas(2, (0, 2), (0, 2)), 4, 4)
+    # Unset ranges are only reused exactly
+    check(ds.Canvas(plot_width=2, plot_height=2, cache=cache), 4, 5)
+    check(ds.Canvas(plot_width=2, plot_height=2, cache=cache), 5, 5)
+    assert len(cache) == 5
+
+    # Different data
+    df2 = df.copy()
+    df2['f64'] += 1
+    canvas(4).points(df2, 'x', 'y', agg)
+    assert cache.misses == 6
+
+    # Lines are not derived from other views
+    canvas(4).line(df, 'x', 'y')
+    assert canvas(2).line(df, 'x', 'y').equals(
+        canvas(2, cache=None).line(df, 'x', 'y'))
+    assert (cache.hits, cache.misses) == (5, 8)
+
+    # Room for the 4x4 (64 bytes) or the 3x3 (36 bytes) int32 counts
+    small = ds.AggregateCache(max_bytes=80)
+    canvas(4, cache=small).points(df, 'x', 'y')
+    canvas(3, cache=small).points(df, 'x', 'y')
+    assert len(small) == 1
+    assert small.nbytes == 36
+    canvas(3, cache=small).points(df, 'x', 'y')
+    assert small.hits == 1
+
+
+@pytest.mark.parametrize('threads', [1, 2])
+def test_aggregate_cache_pan(threads):
+    # Points on a grid of an eighth of a pixel, so that many lie exactly on
+    # the edges of the pixels and of the views
+    xs, ys = np.meshgrid(np.arange(-8, 25) / 64., np.arange(-8, 25) / 64.)
+    pts = pd.DataFrame({'x': xs.ravel(), 'y': ys.ravel(),
+                        'v': np.arange(xs.size) % 7 * 1.})
+    agg = ds.summary(count=ds.count(), mean=ds.mean('v'),
+                     cats=ds.count_cat('cat'))
+    pts['cat'] = pd.Categorical.from_codes(np.arange(xs.size) % 3,
+                                           ['a', 'b', 'c'])
+    cache = ds.AggregateCache()
+
+    def points(x_range, y_range, cache):
+        return ds.Canvas(plot_width=4, plot_height=4, x_range=x_range,
+                         y_range=y_range, cache=cache,
+                         threads=threads).points(pts, 'x', 'y', agg)
+
+    points((0, 0.25), (0, 0.25), cache)
+    # Pans by whole pixels (of 1/16) to either side of either axis, each
+    # from the previous view
+    ranges = [((0.0625, 0.3125), (0, 0.25)),
+              ((-0.0625, 0.1875), (0, 0.25)),
+              ((-0.0625, 0.1875), (0.125, 0.375)),
+              ((-0.0625, 0.1875), (0.0625, 0.3125)),
+              ((-0.125, 0.125), (0.0625, 0.3125))]
+    for n, (x_range, y_range) in enumerate(ranges):
+        assert_eq(points(x_range, y_range, cache),
+                  points(x_range, y_range, None))
+        assert (cache.pans, cache.misses) == (n + 1, 1)
+
+    # Diagonal pans, pans by part of a pixel, and views without overlap
+    # are aggregated again
+    for x_range, y_range in [((0.125, 0.375), (0.1875, 0.4375)),
+                             ((-0.1, 0.15), (0.0625, 0.3125)),
+                             ((1, 1.25), (0.0625, 0.3125))]:
+        assert_eq(points(x_range, y_range, cache),
+                  points(x_range, y_range, None))
+    assert (cache.pans, cache.misses) == (5, 4)
+
+    # Lines are not panned
+    cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(0, 0.25),
+                    y_range=(0, 0.25), cache=cache)
+    cvs.line(pts, 'x', 'y')
+    cvs.x_range = (0.0625, 0.3125)
+    cvs.line(pts, 'x', 'y')
+    assert (cache.pans, cache.misses) == (5, 6)
+
+
+def test_x_sorted():
+    ts = pd.DataFrame({'t': np.linspace(0, 100, 1001),
+                       'v': np.sin(np.linspace(0, 30, 1001)),
+                       'w': np.arange(1001.)})
+    for x_range in [(10.05, 20.3), (-5, 0.2), (99.5, 200), (200, 300)]:
+        cvs = ds.Canvas(plot_width=9, plot_height=5, x_range=x_range,
+                        y_range=(-1, 1))
+        for agg in [ds.count(), ds.mean('w')]:
+            assert cvs.points(ts, 't', 'v', agg, x_sorted=True).equals(
+                cvs.points(ts, 't', 'v', agg))
+            assert cvs.line(ts, 't', 'v', agg, x_sorted=True).equals(
+                cvs.line(ts, 't', 'v', agg))
+
+    with pytest.raises(ValueError):
+        c.line(ts, ['t', 't'], ['v', 'w'], x_sorted=True)
+
+
+def test_line_decimation():
+    from datashader.glyphs import LineAxis0, _build_decimate_rows
+
+    rng = np.random.RandomState(1)
+    n = 20000
+    ts = pd.DataFrame({'t': np.linspace(0, 1, n),
+                       'v': np.cumsum(rng.normal(size=n))})
+    ts.v[5000:5003] = np.nan
+    cvs = ds.Canvas(plot_width=50, plot_height=30,
+                    x_range=(0.1, 0.9), y_range=(-20, 20))
+    assert cvs.line(ts, 't', 'v', x_sorted=True).equals(
+        cvs.line(ts, 't', 'v'))
+    # Decimation is exact on unsorted data too, it just keeps more rows
+    walk = pd.DataFrame({'x': np.cumsum(rng.normal(size=n)),
+                         'y': np.cumsum(rng.normal(size=n))})
+    cvs = ds.Canvas(plot_width=30, plot_height=30, x_range=(-50, 50),
+                    y_range=(-50, 50))
+    assert ds.core.bypixel(walk, cvs, LineAxis0('x', 'y', decimate=True),
+                           ds.any()).equals(cvs.line(walk, 'x', 'y'))
+
+    rows = _build_decimate_rows(ds.core.LinearAxis.mapper)(
+        ts.t.values, ts.v.values, 50.0, 0.0)
+    # 50 columns, one of them split by the 3 NaN rows, plus t == 1
+    assert len(rows) <= 4 * 52 + 3
+
+
+def test_threads_validation():
+    with pytest.raises(ValueError):
+        ds.Canvas(threads=0).points(df, 'x', 'y')
+
+
+def test_precompile():
+    glyph = ds.Point('x', 'y')
+    aggs = [ds.count('f64'), ds.any(), ds.count_cat('cat')]
+    timings = ds.precompile(df, [glyph], aggs, canvas_shapes=[(2, 2), (3, 3)])
+    assert list(timings) == [(glyph, agg, step) for agg in aggs
+                             for step in ['compile', 'aggregate', 'shade']]
+    assert all(t >= 0 for t in timings.values())
+
+    schema = ds.utils.dshape_from_pandas(df[['x', 'y', 'f64']]).measure
+    append = ds.compiler.compile_components(aggs[0], schema, glyph)[2]
+    assert append.signatures
+
+    for axis_type in ['linear', 'log']:
+        lines = [ds.glyphs.LineAxis0('x', 'y')]
+        timings = ds.precompile(df, [glyph] + lines, [ds.count()],
+                                x_axis_type=axis_type, y_axis_type=axis_type)
+        assert len(timings) == 6
+
+    with pytest.raises(ValueError, match='pandas or dask DataFrame$'):
+        ds.precompile(df.values, [glyph], aggs)
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.mean('f64'), ds.std('f64'),
+                                 ds.count_cat('cat'),
+                                 ds.summary(a=ds.max('i32'), b=ds.any())])
+def test_accumulator_points(agg):
+    acc = ds.Accumulator(c, ds.Point('x', 'y'), agg)
+    for batch in np.array_split(np.arange(len(df)), 3):
+        acc.extend(df.iloc[batch])
+    assert_eq(acc.finalize(), c.points(df, 'x', 'y', agg))
+
+    # Finalized aggregates are not affected by later batches
+    out = acc.finalize()
+    acc.extend(df)
+    assert_eq(out, c.points(df, 'x', 'y', agg))
+
+    # Bases can be handed to a new accumulator
+    acc2 = ds.Accumulator(c, ds.Point('x', 'y'), agg, bases=acc.bases)
+    acc2.extend(df)
+    assert_eq(acc2.finalize(), c.points(pd.concat([df] * 3), 'x', 'y', agg))
+
+
+def test_accumulator_line():
+    xs = np.linspace(-3, 3, 41)
+    ldf = pd.DataFrame({'x': xs, 'y': np.sin(3 * xs) * 3})
+    cvs = ds.Canvas(plot_width=9, plot_height=9,
+                    x_range=(-3, 3), y_range=(-3, 3))
+    acc = ds.Accumulator(cvs, ds.glyphs.LineAxis0('x', 'y'), ds.count())
+    for batch in np.array_split(np.arange(len(ldf)), 4):
+        acc.extend(ldf.iloc[batch])
+    assert_eq(acc.finalize(), cvs.line(ldf, 'x', 'y', ds.count()))
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('f64')])
+def test_accumulator_decay(agg):
+    acc = ds.Accumulator(c, ds.Point('x', 'y'), agg, decay=0.5)
+    batches = [df.iloc[batch] for batch in
+               np.array_split(np.arange(len(df)), 3)]
+    for batch in batches:
+        acc.extend(batch)
+    out = acc.finalize()
+    aggs = [c.points(batch, 'x', 'y', agg).fillna(0) for batch in batches]
+    sol = 0.25 * aggs[0] + 0.5 * aggs[1] + aggs[2]
+    assert out.dtype == 'f8'
+    np.testing.assert_allclose(out.fillna(0).values, sol.values)
+    assert np.isnan(out.values).sum() == (sol.values == 0).sum()
+    assert out.attrs['span'] == acc.span
+    assert acc.span[1] >= np.nanmax(out.values)
+
+
+def test_accumulator_decay_dtype():
+    with pytest.raises(ValueError):
+        ds.Accumulator(c, ds.Point('x', 'y'), ds.count(dtype='u2'), decay=0.5)
+
+    acc = ds.Accumulator(c, ds.Point('x', 'y'), ds.count(dtype='f4'),
+                         decay=0.5)
+    acc.extend(df)
+    acc.extend(df.iloc[:1])
+    out = acc.finalize()
+    sol = 0.5 * c.points(df, 'x', 'y', ds.count()).astype('f4')
+    sol.values[0, 0] += 1
+    assert out.dtype == 'f4'
+    assert_eq(out.fillna(0), sol)
+    assert np.isnan(out.values).sum() == (sol.values == 0).sum()
+
+
+def test_accumulator_errors():
+    with pytest.raises(ValueError):
+        ds.Accumulator(ds.Canvas(), ds.Point('x', 'y'), ds.count())
+
+    acc = ds.Accumulator(c, ds.Point('x', 'y'), ds.count_cat('cat'))
+    with pytest.raises(ValueError):
+        acc.finalize()
+    acc.extend(df)
+    other = df.assign(cat=df.cat.cat.add_categories(['e']))
+    with pytest.raises(ValueError):
+        acc.extend(other)
+
+    with pytest.raises(ValueError):
+        ds.Accumulator(c, ds.Point('x', 'y'), ds.mean('f64'), decay=0.5)
+    with pytest.raises(ValueError):
+        ds.Accumulator(c, ds.Point('x', 'y'), ds.count(), decay=1.5)
+
+
 def test_log_axis_line():
     axis = ds.core.LogAxis()
     logcoords = axis.compute_index(axis.compute_scale_and_translate((1, 10), 2), 2)
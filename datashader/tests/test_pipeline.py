@@ -32,3 +32,16 @@ def test_pipeline():
     img = pipeline((0, 1), (0, 1), 2, 2)
     agg = cvs.points(df, 'x', 'y', ds.sum('f64'))
     assert img.equals(tf.shade(agg))
+
+
+def test_pipeline_cache():
+    pipeline = ds.Pipeline(df, ds.Point('x', 'y'), cache=True)
+    img = pipeline((0, 1), (0, 1), 2, 2)
+    assert pipeline((0, 1), (0, 1), 2, 2).equals(img)
+    assert (pipeline.cache.hits, pipeline.cache.misses) == (1, 1)
+    # The frame is only hashed once
+    assert len(pipeline.cache._tokens) == 1
+
+    pipeline = ds.Pipeline(df, ds.Point('x', 'y'))
+    assert pipeline((0, 1), (0, 1), 2, 2).equals(img)
+    assert pipeline.cache is None
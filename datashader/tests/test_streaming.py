@@ -0,0 +1,104 @@
+from __future__ import division
+
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+import datashader as ds
+
+
+cvs = ds.Canvas(plot_width=4, plot_height=4, x_range=(0, 4), y_range=(0, 4))
+glyph = ds.glyphs.Point('x', 'y')
+
+
+def make_batch(seed, n=50):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({'x': rng.uniform(0, 4, n),
+                         'y': rng.uniform(0, 4, n),
+                         'z': rng.uniform(0, 1, n)})
+
+
+batches = [make_batch(i) for i in range(6)]
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('z'), ds.mean('z'),
+                                 ds.max('z')])
+def test_tumbling(agg):
+    stream = ds.StreamingCanvas(cvs, glyph, agg, window=2)
+    for i, batch in enumerate(batches):
+        out = stream.extend(batch).finalize()
+        start = i - i % 2
+        expected = cvs.points(pd.concat(batches[start:i + 1]), 'x', 'y', agg)
+        xr.testing.assert_allclose(out, expected)
+
+
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('z'), ds.min('z')])
+def test_sliding(agg):
+    stream = ds.StreamingCanvas(cvs, glyph, agg, window=3, slide=1)
+    for i, batch in enumerate(batches):
+        out = stream.extend(batch).finalize()
+        start = max(0, i - 2)
+        expected = cvs.points(pd.concat(batches[start:i + 1]), 'x', 'y', agg)
+        xr.testing.assert_allclose(out, expected)
+    assert stream.pane_ids == [3, 4, 5]
+
+
+def test_sliding_time():
+    df = pd.concat(batches, ignore_index=True)
+    df['t'] = pd.Timestamp('2019-01-01') + pd.to_timedelta(
+        np.arange(len(df)), unit='s')
+    stream = ds.StreamingCanvas(cvs, glyph, ds.count(), window='2min',
+                                slide='1min', time='t')
+    stream.extend(df.iloc[:150]).extend(df.iloc[150:])
+    last = df.t.iloc[-1].floor('1min')
+    expected = cvs.points(df[df.t >= last - pd.Timedelta('1min')], 'x', 'y')
+    xr.testing.assert_equal(stream.finalize(), expected)
+
+    # Late rows outside the window are dropped
+    stream.extend(df.iloc[:10])
+    xr.testing.assert_equal(stream.finalize(), expected)
+
+    # Any timedelta-like window, but not numbers, for datetimes
+    stream = ds.StreamingCanvas(cvs, glyph, ds.count(),
+                                window=datetime.timedelta(minutes=2),
+                                slide=np.timedelta64(1, 'm'), time='t')
+    stream.extend(df)
+    xr.testing.assert_equal(stream.finalize(), expected)
+    stream = ds.StreamingCanvas(cvs, glyph, ds.count(), window=120,
+                                slide=60, time='t')
+    with pytest.raises(ValueError, match='timedelta-like'):
+        stream.extend(df)
+
+
+def test_numeric_time_with_missing():
+    df = pd.concat(batches[:2], ignore_index=True)
+    df['t'] = np.arange(len(df), dtype='f8')
+    df.loc[::7, 't'] = np.nan
+    stream = ds.StreamingCanvas(cvs, glyph, ds.count(), window=40, slide=20,
+                                time='t')
+    out = stream.extend(df).finalize()
+    expected = cvs.points(df[df.t >= 60], 'x', 'y')
+    xr.testing.assert_equal(out, expected)
+
+
+def test_accumulator_combine():
+    accs = [ds.Accumulator(cvs, glyph, ds.mean('z')).extend(b)
+            for b in batches[:3]]
+    out = ds.Accumulator(cvs, glyph, ds.mean('z')).combine(*accs).finalize()
+    expected = cvs.points(pd.concat(batches[:3]), 'x', 'y', ds.mean('z'))
+    xr.testing.assert_allclose(out, expected)
+    # Inputs are left untouched
+    xr.testing.assert_allclose(accs[0].finalize(),
+                               cvs.points(batches[0], 'x', 'y', ds.mean('z')))
+
+
+def test_errors():
+    with pytest.raises(ValueError):
+        ds.StreamingCanvas(cvs, glyph, ds.count(), window=3, slide=2)
+    with pytest.raises(ValueError):
+        ds.StreamingCanvas(cvs, glyph, ds.count(), window=1, slide=2)
+    with pytest.raises(ValueError):
+        ds.StreamingCanvas(cvs, glyph, ds.count(), window=2).finalize()
@@ -183,6 +183,23 @@ def test_span_cmap_mpl():
     check_span(x, cmap, 'log', sol)
 
 
+@pytest.mark.parametrize('how', ['linear', 'log', 'cbrt'])
+def test_span_attr(how):
+    x = agg.a.copy()
+    x.attrs['span'] = (0, 30)
+    img = tf.shade(x, cmap=['pink', 'red'], how=how)
+    sol = tf.shade(agg.a, cmap=['pink', 'red'], how=how, span=(0, 30))
+    assert img.equals(sol)
+    assert not img.equals(tf.shade(agg.a, cmap=['pink', 'red'], how=how))
+
+    # An explicit span takes precedence, and eq_hist ignores the attribute
+    img = tf.shade(x, cmap=['pink', 'red'], how=how, span=(5, 10))
+    sol = tf.shade(agg.a, cmap=['pink', 'red'], how=how, span=(5, 10))
+    assert img.equals(sol)
+    img = tf.shade(x, cmap=['pink', 'red'], how='eq_hist')
+    assert img.equals(tf.shade(agg.a, cmap=['pink', 'red'], how='eq_hist'))
+
+
 def test_shade_bool():
     data = ~np.eye(3, dtype='bool')
     x = xr.DataArray(data, coords=coords, dims=dims)
@@ -197,6 +214,11 @@ def test_shade_bool():
     img = tf.shade(x, cmap=['pink', 'red'], how='eq_hist')
     assert img.equals(sol)
 
+    x = xr.DataArray(np.zeros((3, 3), dtype='bool'), coords=coords, dims=dims)
+    sol = xr.DataArray(np.zeros((3, 3), dtype='uint32'), coords=coords, dims=dims)
+    img = tf.shade(x, cmap=['pink', 'red'], how='eq_hist')
+    assert img.equals(sol)
+
 
 def test_shade_cmap():
     cmap = ['red', (0, 255, 0), '#0000FF']
@@ -274,6 +296,30 @@ def test_shade_category():
     assert img.equals(sol)
 
 
+def test_shade_category_sparse():
+    coords = [np.array([0, 1]), np.array([2, 5])]
+    cat_agg = xr.DataArray(np.array([[(0, 12, 0), (3, 0, 3)],
+                                    [(12, 12, 12), (24, 0, 0)]]),
+                           coords=(coords + [['a', 'b', 'c']]),
+                           dims=(dims + ['cats']))
+    # The same counts in sparse slots (the last one for overflow)
+    counts = np.array([[(12, 0, 0, 0), (3, 3, 0, 0)],
+                       [(12, 12, 12, 0), (24, 0, 0, 0)]])
+    codes = np.array([[(1, -1, -1, -1), (0, 2, -1, -1)],
+                      [(2, 0, 1, -1), (0, -1, -1, -1)]])
+    sparse_agg = xr.DataArray(counts, dims=(dims + ['slot']),
+                              coords={dims[0]: coords[0],
+                                      dims[1]: coords[1],
+                                      'cats': (dims + ['slot'], codes)},
+                              attrs={'categories': ['a', 'b', 'c']})
+
+    colors = [(255, 0, 0), '#0000FF', 'orange']
+    for how in ['log', 'linear']:
+        img = tf.shade(sparse_agg, color_key=colors, how=how, min_alpha=20)
+        sol = tf.shade(cat_agg, color_key=colors, how=how, min_alpha=20)
+        assert img.equals(sol)
+
+
 coords2 = [np.array([0, 2]), np.array([3, 5])]
 img1 = tf.Image(np.array([[0xff00ffff, 0x00000000],
                           [0x00000000, 0xff00ff7d]], dtype='uint32'),
@@ -1,6 +1,8 @@
 from datashape import dshape
+import numpy as np
+import pandas as pd
 
-from datashader.utils import Dispatcher, isreal
+from datashader.utils import Dispatcher, isreal, dshape_from_pandas
 
 
 def test_Dispatcher():
@@ -25,3 +27,22 @@ def test_isreal():
     assert isreal('float64')
     assert not isreal('complex64')
     assert not isreal('{x: int64, y: float64}')
+
+
+def test_dshape_from_pandas():
+    df = pd.DataFrame({'a': np.arange(3, dtype='i4'),
+                       'b': np.zeros(3),
+                       'c': pd.Categorical(['x', 'y', 'x'])})
+    ds = dshape_from_pandas(df)
+    assert ds.shape == (3,)
+    assert ds.measure.names == ['a', 'b', 'c']
+    assert ds.measure['c'].categories == ('x', 'y')
+    assert dshape_from_pandas(df, ['b', 'a']) == dshape('3 * {b: float64, a: int32}')
+
+    # Records are cached on the column dtypes, including the categories
+    assert (dshape_from_pandas(df.iloc[:1]).measure is
+            dshape_from_pandas(df).measure)
+    other = df.assign(c=df.c.cat.add_categories(['z']))
+    assert dshape_from_pandas(other).measure != dshape_from_pandas(df).measure
+    other = df.assign(c=df.c.cat.reorder_categories(['y', 'x']))
+    assert dshape_from_pandas(other).measure['c'].categories == ('y', 'x')
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 import xarray as xr
 
 import datashader as ds
@@ -50,4 +51,61 @@ def test_count(source):
     assert_eq(c.points(source, 'x', 'y', ds.count('f64')), out)
 
 
+@pytest.mark.parametrize("source", [
+    (xda), (xdda), (xds), (xdds),
+])
+def test_multi(source):
+    views = [ds.Canvas(plot_width=4, plot_height=3, x_range=(0, 1),
+                       y_range=(0, 1)),
+             ds.Canvas(plot_width=3, plot_height=2)]
+    out = c.multi(source, 'x', 'y', ds.mean('f64'), views=views)
+    assert len(out) == 3
+    for canvas, result in zip([c] + views, out):
+        assert_eq(result, canvas.points(source, 'x', 'y', ds.mean('f64')))
+
+
+# A swath-like dataset, with 2D coordinates and a 1D (broadcast) coordinate
+lon, lat = np.meshgrid(np.linspace(0, 1, 7), np.linspace(0, 1, 5))
+swath = xr.Dataset({'value': (('row', 'col'), np.arange(35.).reshape(5, 7))},
+                   coords={'lon': (('row', 'col'), lon + lat / 3),
+                           'lat': (('row', 'col'), lat - lon / 3),
+                           'row': np.arange(5.)})
+swath_df = swath.to_dataframe().reset_index()
+cs = ds.Canvas(plot_width=4, plot_height=3)
+
+
+@pytest.mark.parametrize('source', [swath, swath.chunk({'row': 2, 'col': 3}),
+                                    swath.chunk({'row': 2}).value])
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('value'), ds.max('row')])
+def test_gridded_points(source, agg):
+    sol = cs.points(swath_df, 'lon', 'lat', agg)
+    assert_eq(cs.points(source, 'lon', 'lat', agg), sol)
+
+
+# A raster with 1D lat/lon coordinates, broadcast against each other
+raster = xr.DataArray(np.arange(35.).reshape(5, 7), dims=('lat', 'lon'),
+                      coords={'lat': np.linspace(0, 1, 5),
+                              'lon': np.linspace(0, 1, 7)}, name='value')
+raster_df = raster.to_dataframe().reset_index()
+
+
+@pytest.mark.parametrize('source', [raster, raster.chunk({'lat': 2})])
+@pytest.mark.parametrize('agg', [ds.count(), ds.sum('value')])
+def test_raster_points(source, agg):
+    sol = cs.points(raster_df, 'lon', 'lat', agg)
+    assert_eq(cs.points(source, 'lon', 'lat', agg), sol)
+
+
+def test_gridded_points_in_blocks(monkeypatch):
+    monkeypatch.setattr(ds.xarray, 'chunk_size', 10)
+    sol = cs.points(swath_df, 'lon', 'lat', ds.mean('value'))
+    assert_eq(cs.points(swath, 'lon', 'lat', ds.mean('value')), sol)
+
 
+def test_gridded_accumulator():
+    cvs = ds.Canvas(plot_width=4, plot_height=3, x_range=(0, 1),
+                    y_range=(-0.5, 1))
+    acc = ds.Accumulator(cvs, ds.Point('lon', 'lat'), ds.count())
+    acc.extend(swath).extend(swath.chunk({'row': 2}))
+    sol = cvs.points(pd.concat([swath_df] * 2), 'lon', 'lat', ds.count())
+    assert_eq(acc.finalize(), sol)
@@ -181,6 +181,8 @@ def _interpolate(agg, cmap, how, alpha, span, min_alpha, name):
     if np.issubdtype(data.dtype, np.bool_):
         mask = ~data
         interp = data
+        if mask.all():
+            return Image(np.zeros(shape=data.shape, dtype=np.uint32), coords=agg.coords, dims=agg.dims, attrs=agg.attrs, name=name)
     else:
         if np.issubdtype(data.dtype, np.integer):
             mask = data == 0
@@ -256,7 +258,11 @@ def _interpolate(agg, cmap, how, alpha, span, min_alpha, name):
 def _colorize(agg, color_key, how, min_alpha, name):
     if not agg.ndim == 3:
         raise ValueError("agg must be 3D")
-    cats = agg.indexes[agg.dims[-1]]
+    sparse = agg.dims[-1] == 'slot' and 'categories' in agg.attrs
+    if sparse:
+        cats = agg.attrs['categories']
+    else:
+        cats = agg.indexes[agg.dims[-1]]
     if color_key is None:
         raise ValueError("Color key must be provided, with at least as many " +
                          "colors as there are categorical fields")
@@ -275,9 +281,12 @@ def _colorize(agg, color_key, how, min_alpha, name):
     total = data.sum(axis=2)
     # zero-count pixels will be 0/0, but it's safe to ignore that when dividing
     with np.errstate(divide='ignore', invalid='ignore'):
-        r = (data.dot(rs)/total).astype(np.uint8)
-        g = (data.dot(gs)/total).astype(np.uint8)
-        b = (data.dot(bs)/total).astype(np.uint8)
+        if sparse:
+            r, g, b = _sparse_colors(agg_t, data, rs, gs, bs)
+        else:
+            r = (data.dot(rs)/total).astype(np.uint8)
+            g = (data.dot(gs)/total).astype(np.uint8)
+            b = (data.dot(bs)/total).astype(np.uint8)
     offset = total.min()
     mask = np.isnan(total)
     if offset == 0:
@@ -288,10 +297,30 @@ def _colorize(agg, color_key, how, min_alpha, name):
                   [min_alpha, 255], left=0, right=255).astype(np.uint8)
     r[mask] = g[mask] = b[mask] = 255
     return Image(np.dstack([r, g, b, a]).view(np.uint32).reshape(a.shape),
-                 dims=agg.dims[:-1], coords=list(agg.coords.values())[:-1],
+                 dims=agg.dims[:-1], coords=[agg.coords[d] for d in agg.dims[:-1]],
                  name=name)
 
 
+def _sparse_colors(agg_t, counts, rs, gs, bs):
+    """Average the colors of the categories in the slots of a sparse
+    ``count_cat`` aggregate, weighted by their ``counts``, without building
+    the dense array of all the categories.
+
+    Counts of empty and overflow slots (with code ``-1``) are not weighted,
+    as their category is unknown.
+    """
+    codes_name = next(c for c in agg_t.coords
+                      if set(agg_t.coords[c].dims) == set(agg_t.dims))
+    codes = agg_t.coords[codes_name].transpose(*agg_t.dims)
+    codes = orient_array(codes).transpose([1, 2, 0])
+    known = codes >= 0
+    weights = np.where(known, counts, 0)
+    codes = np.where(known, codes, 0)
+    known_total = weights.sum(axis=2)
+    return tuple(((weights * c[codes]).sum(axis=2) / known_total)
+                 .astype(np.uint8) for c in (rs, gs, bs))
+
+
 def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
           how='eq_hist', alpha=255, min_alpha=40, span=None, name=None):
     """Convert a DataArray to an image by choosing an RGBA pixel color for each value.
@@ -316,6 +345,11 @@ def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
     collapsed across all categories at that location, ranging from the
     specified ``min_alpha`` to the maximum alpha value (255).
 
+    Sparse ``count_cat(column, slots=n)`` aggregates are shaded directly
+    from their slots. They are approximate for pixels with more than ``n``
+    categories: only the most frequent categories kept in the slots are
+    averaged, but the counts of the overflow slot add to the alpha.
+
     Parameters
     ----------
     agg : DataArray
@@ -350,7 +384,9 @@ def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
         the expense of the overall dynamic range.
     span : list of min-max range, optional
         Min and max data values to use for colormap interpolation, when
-        wishing to override autoranging.
+        wishing to override autoranging. If not provided, the ``span``
+        attribute of ``agg`` is used when present (e.g. as set for decaying
+        aggregates by ``Accumulator``), unless ``how`` is 'eq_hist'.
     name : string name, optional
         Optional string name to give to the Image object to return, 
         to label results for display.
@@ -360,6 +396,8 @@ def shade(agg, cmap=["lightblue", "darkblue"], color_key=Sets1to3,
     name = agg.name if name is None else name
     
     if agg.ndim == 2:
+        if span is None and how != 'eq_hist':
+            span = agg.attrs.get('span')
         return _interpolate(agg, cmap, how, alpha, span, min_alpha, name)
     elif agg.ndim == 3:
         return _colorize(agg, color_key, how, min_alpha, name)
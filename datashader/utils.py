@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, print_function
 
 import os
 
+from collections import OrderedDict
 from inspect import getmro
 
 import numba as nb
@@ -10,6 +11,7 @@ import pandas as pd
 
 from xarray import DataArray
 import dask.dataframe as dd
+from dask.base import normalize_token
 import datashape
 
 try:
@@ -360,38 +362,181 @@ def dshape_from_pandas_helper(col):
     """Return an object from datashape.coretypes given a column from a pandas
     dataframe.
     """
-    if isinstance(col.dtype, type(pd.Categorical.dtype)) or isinstance(col.dtype, pd.api.types.CategoricalDtype):
+    return dshape_from_pandas_dtype(col.dtype)
+
+
+def dshape_from_pandas_dtype(dtype):
+    """Return an object from datashape.coretypes given a pandas dtype."""
+    if isinstance(dtype, pd.api.types.CategoricalDtype):
         cat_dshape = datashape.dshape('{} * {}'.format(
-            len(col.cat.categories),
-            col.cat.categories.dtype,
+            len(dtype.categories),
+            dtype.categories.dtype,
         ))
-        return datashape.Categorical(col.cat.categories.values,
+        return datashape.Categorical(dtype.categories.values,
                                      type=cat_dshape,
-                                     ordered=col.cat.ordered)
-    elif col.dtype.kind == 'M':
-        tz = getattr(col.dtype, 'tz', None)
+                                     ordered=dtype.ordered)
+    elif dtype.kind == 'M':
+        tz = getattr(dtype, 'tz', None)
         if tz is not None:
             # Pandas stores this as a pytz.tzinfo, but DataShape wants a string
             tz = str(tz)
         return datashape.Option(datashape.DateTime(tz=tz))
-    elif isinstance(col.dtype, RaggedDtype):
-        return col.dtype
-    dshape = datashape.CType.from_numpy_dtype(col.dtype)
+    elif isinstance(dtype, RaggedDtype):
+        return dtype
+    dshape = datashape.CType.from_numpy_dtype(dtype)
     dshape = datashape.string if dshape == datashape.object_ else dshape
     if dshape in (datashape.string, datashape.datetime_):
         return datashape.Option(dshape)
     return dshape
 
 
-def dshape_from_pandas(df):
-    """Return a datashape.DataShape object given a pandas dataframe."""
-    return len(df) * datashape.Record([(k, dshape_from_pandas_helper(df[k]))
-                                       for k in df.columns])
+# Records are cached by column names and dtypes, as building them (in
+# particular datashape.Categorical) can cost more than aggregating a small
+# frame. The cache is simply cleared when it grows too large.
+_record_cache = {}
+_record_cache_size = 128
+
+
+def _dtype_key(dtype):
+    """Return a hashable key identifying ``dtype``.
+
+    Unordered categorical dtypes compare equal regardless of the order of
+    their categories, which does matter to datashape.Categorical, so they're
+    keyed on the categories themselves.
+    """
+    if isinstance(dtype, pd.api.types.CategoricalDtype):
+        return (tuple(dtype.categories), dtype.ordered)
+    return dtype
+
+
+def _record_from_dtypes(dtypes):
+    """Return a datashape.Record given a tuple of ``(name, dtype)`` pairs."""
+    key = tuple((k, _dtype_key(v)) for (k, v) in dtypes)
+    try:
+        return _record_cache[key]
+    except KeyError:
+        pass
+    except TypeError:
+        # Unhashable dtype, don't cache
+        return datashape.Record([(k, dshape_from_pandas_dtype(v))
+                                 for (k, v) in dtypes])
+    record = datashape.Record([(k, dshape_from_pandas_dtype(v))
+                               for (k, v) in dtypes])
+    if len(_record_cache) >= _record_cache_size:
+        _record_cache.clear()
+    _record_cache[key] = record
+    return record
+
+
+def dshape_from_pandas(df, columns=None):
+    """Return a datashape.DataShape object given a pandas dataframe.
+
+    If ``columns`` is provided, only those columns are included in the
+    record, without copying the dataframe.
+    """
+    if columns is None:
+        columns = df.columns
+    return len(df) * _record_from_dtypes(tuple((k, df[k].dtype)
+                                               for k in columns))
+
+
+def dshape_from_dask(df, columns=None):
+    """Return a datashape.DataShape object given a dask dataframe.
+
+    The schema is derived from the dataframe's ``_meta``, without computing
+    anything. Categorical columns must have known categories.
+    """
+    if columns is None:
+        columns = df.columns
+    return datashape.var * dshape_from_pandas(df._meta, columns).measure
+
+
+def dshape_from_xarray_dataset(ds, columns=None):
+    """Return a datashape.DataShape object given an xarray Dataset.
+
+    Each variable (or coordinate) in ``columns`` is described as a column of
+    the flattened, broadcast variables, without loading any data.
+    """
+    if columns is None:
+        columns = list(ds.coords) + list(ds.data_vars)
+    return datashape.var * _record_from_dtypes(tuple((k, ds[k].dtype)
+                                                     for k in columns))
+
+
+class ArrayColumns(object):
+    """A read-only, dataframe-like view of a set of equal length 1D arrays.
+
+    Provides just enough of the ``pandas.DataFrame`` interface for the
+    pandas backend (``columns``, ``len``, column access and ``iloc`` row
+    slicing), so that dicts of arrays, structured arrays and memory-mapped
+    columns can be aggregated without copying them into a DataFrame.
+
+    Parameters
+    ----------
+    data : dict of array-like, or numpy structured array
+        The columns. Categorical columns can be given as
+        ``pandas.Categorical``.
+    """
+    def __init__(self, data):
+        if isinstance(data, np.ndarray) and data.dtype.names:
+            # Fields of a structured array are (strided) views
+            data = OrderedDict((k, data[k]) for k in data.dtype.names)
+        columns = OrderedDict()
+        for k, v in data.items():
+            if not isinstance(v, (np.ndarray, pd.Categorical)):
+                v = np.asarray(v)
+            if v.ndim != 1:
+                raise ValueError('column {0!r} is not 1D'.format(k))
+            columns[k] = v
+        if len(set(len(v) for v in columns.values())) > 1:
+            raise ValueError('columns must all have the same length')
+        self._data = columns
+        self._series = {}
+
+    @property
+    def columns(self):
+        return list(self._data)
+
+    def __len__(self):
+        return len(next(iter(self._data.values()))) if self._data else 0
+
+    def __getitem__(self, key):
+        if isinstance(key, list):
+            return pd.DataFrame(OrderedDict((k, self._data[k]) for k in key))
+        if key not in self._series:
+            self._series[key] = pd.Series(self._data[key], name=key,
+                                          copy=False)
+        return self._series[key]
+
+    @property
+    def iloc(self):
+        return _ArrayColumnsRows(self)
+
+    def __dask_tokenize__(self):
+        return (type(self).__name__,
+                [(k, normalize_token(v)) for (k, v) in self._data.items()])
+
+    @classmethod
+    def concat(cls, frames):
+        """Concatenate the rows of several ``ArrayColumns``."""
+        data = OrderedDict()
+        for k in frames[0].columns:
+            if isinstance(frames[0]._data[k], pd.Categorical):
+                data[k] = pd.concat([f[k] for f in frames]).values
+            else:
+                data[k] = np.concatenate([f._data[k] for f in frames])
+        return cls(data)
+
 
+class _ArrayColumnsRows(object):
+    def __init__(self, frame):
+        self._frame = frame
 
-def dshape_from_dask(df):
-    """Return a datashape.DataShape object given a dask dataframe."""
-    return datashape.var * dshape_from_pandas(df.head()).measure
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('ArrayColumns only supports slicing rows')
+        return ArrayColumns(OrderedDict((k, v[key]) for (k, v)
+                                        in self._frame._data.items()))
 
 
 def dataframe_from_multiple_sequences(x_values, y_values):
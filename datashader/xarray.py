@@ -0,0 +1,228 @@
+from __future__ import absolute_import, division
+
+from collections import OrderedDict
+
+import dask
+import dask.array as da
+import numpy as np
+import xarray as xr
+from dask.base import tokenize
+from dask.core import flatten
+from toolz import merge
+
+from .core import bypixel, _view_transforms
+from .compiler import compile_components
+from .dask import cached_bounds, tree_combine
+from .pandas import extend_bases, extend_multi_bases
+from .utils import ArrayColumns
+
+__all__ = ()
+
+
+# Number of cells of a NumPy-backed Dataset that are flattened and aggregated
+# at a time. Bounds the memory needed to broadcast gridded coordinates.
+chunk_size = 2 ** 20
+
+
+@bypixel.pipeline.register(xr.Dataset)
+def xarray_pipeline(ds, schema, canvas, glyph, summary):
+    finalize = compile_components(summary, schema, glyph)[4]
+
+    x_range, y_range = canvas.x_range, canvas.y_range
+    if not x_range or not y_range:
+        x_bounds, y_bounds = _compute_bounds(glyph, ds)
+        x_range = x_range or x_bounds
+        y_range = y_range or y_bounds
+
+    width = canvas.plot_width
+    height = canvas.plot_height
+
+    x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+
+    x_axis = canvas.x_axis.compute_index(x_st, width)
+    y_axis = canvas.y_axis.compute_index(y_st, height)
+
+    bases = aggregate(ds, schema, canvas, glyph, summary, x_range, y_range)
+
+    return finalize(bases,
+                    coords=[y_axis, x_axis],
+                    dims=[glyph.y_label, glyph.x_label])
+
+
+@bypixel.extend.register(xr.Dataset)
+def xarray_extend(ds, schema, canvas, glyph, summary, bases, **kwargs):
+    return aggregate(ds, schema, canvas, glyph, summary, canvas.x_range,
+                     canvas.y_range, bases)
+
+
+@bypixel.multi.register(xr.Dataset)
+def xarray_multi(ds, schema, canvases, glyph, summary):
+    finalize = compile_components(summary, schema, glyph)[4]
+    x_bounds = y_bounds = None
+    if any(c.x_range is None or c.y_range is None for c in canvases):
+        x_bounds, y_bounds = _compute_bounds(glyph, ds)
+    views = _view_transforms(canvases, x_bounds, y_bounds)
+    views_bases = multi_bases(ds, schema, canvases, glyph, summary, views)
+    return [finalize(bases, coords=coords,
+                     dims=[glyph.y_label, glyph.x_label])
+            for (bases, (_, _, _, coords)) in zip(views_bases, views)]
+
+
+@bypixel.extend_multi.register(xr.Dataset)
+def xarray_extend_multi(ds, schema, canvases, glyph, summary):
+    return multi_bases(ds, schema, canvases, glyph, summary,
+                       _view_transforms(canvases))
+
+
+def multi_bases(ds, schema, canvases, glyph, summary, views):
+    """Return the bases of ``ds`` on every canvas of a ``Canvas.multi``
+    aggregation, whose ``(shape, vt, bounds, coords)`` are ``views``, in one
+    pass over the data."""
+    create, _, _, combine, _ = compile_components(summary, schema, glyph)
+    names = list(schema.names)
+    arrays = _broadcast_arrays(ds, names)
+    if not any(isinstance(a, da.Array) for a in arrays):
+        arrays = [np.atleast_1d(a) for a in arrays]
+        shape = arrays[0].shape
+        step = max(1, chunk_size // max(1, int(np.prod(shape[1:]))))
+        views_bases = [create(view_shape) for (view_shape, _, _, _) in views]
+        for start in range(0, shape[0], step):
+            df = _columns(names, [a[start:start + step] for a in arrays])
+            views_bases = extend_multi_bases(glyph, df, schema, canvases,
+                                             summary, views, views_bases)
+        return views_bases
+
+    def chunk(*blocks):
+        return extend_multi_bases(glyph, _columns(names, blocks), schema,
+                                  canvases, summary, views, threads=1)
+
+    def combine_views(results):
+        return [combine(list(bs)) for bs in zip(*results)]
+
+    name = tokenize(*(arrays + [canvases, glyph, summary,
+                                [view[1:3] for view in views]]))
+    return _compute_blocks(arrays, chunk, combine_views, name)
+
+
+def _compute_bounds(glyph, ds):
+    """Return the x and y extents of ``ds`` for ``glyph``.
+
+    If either coordinate is dask-backed, both extents are computed together
+    and cached by the token of the coordinates, like those of dask
+    DataFrames.
+    """
+    xs, ys = ds[glyph.x].data, ds[glyph.y].data
+    if not isinstance(xs, da.Array) and not isinstance(ys, da.Array):
+        return (glyph.maybe_expand_bounds(glyph._compute_x_bounds(np.ravel(xs))),
+                glyph.maybe_expand_bounds(glyph._compute_y_bounds(np.ravel(ys))))
+
+    def compute_bounds():
+        xs_, ys_ = da.asarray(xs), da.asarray(ys)
+        bounds = dask.compute(da.nanmin(xs_), da.nanmax(xs_),
+                              da.nanmin(ys_), da.nanmax(ys_))
+        return (glyph.maybe_expand_bounds(bounds[:2]),
+                glyph.maybe_expand_bounds(bounds[2:]))
+
+    return cached_bounds((tokenize(xs, ys), glyph), compute_bounds)
+
+
+def _broadcast_arrays(ds, names):
+    """Broadcast the variables ``names`` of ``ds`` against each other.
+
+    Returns a list of arrays with a common shape. Broadcasting doesn't copy
+    NumPy data, and the dimensions are ordered as in the variable with the
+    most dimensions (followed by any others), so that its data can be
+    flattened without copying.
+    """
+    variables = [ds[name] for name in names]
+    dims = []
+    for v in sorted(variables, key=lambda v: -v.ndim):
+        dims.extend(d for d in v.dims if d not in dims)
+    variables = xr.broadcast(*variables)
+    return [v.variable.transpose(*dims).data for v in variables]
+
+
+def _columns(names, arrays):
+    return ArrayColumns(OrderedDict((name, np.ravel(a))
+                                    for (name, a) in zip(names, arrays)))
+
+
+def aggregate(ds, schema, canvas, glyph, summary, x_range, y_range,
+              bases=None):
+    """Aggregate the (flattened) variables of ``ds`` into ``bases``, or into
+    new bases if None.
+
+    NumPy-backed variables are flattened a block of rows at a time and
+    aggregated by the pandas backend; if any variable is dask-backed, every
+    block is aggregated in its own task.
+    """
+    names = list(schema.names)
+    arrays = _broadcast_arrays(ds, names)
+    if not any(isinstance(a, da.Array) for a in arrays):
+        arrays = [np.atleast_1d(a) for a in arrays]
+        shape = arrays[0].shape
+        step = max(1, chunk_size // max(1, int(np.prod(shape[1:]))))
+        for start in range(0, shape[0], step):
+            df = _columns(names, [a[start:start + step] for a in arrays])
+            bases = extend_bases(glyph, df, schema, canvas, summary,
+                                 x_range, y_range, bases)
+        if bases is None:
+            create = compile_components(summary, schema, glyph)[0]
+            bases = create((canvas.plot_height, canvas.plot_width))
+        return bases
+
+    aggs = _dask_aggregate(names, arrays, schema, canvas, glyph, summary,
+                           x_range, y_range)
+    if bases is None:
+        return aggs
+    combine = compile_components(summary, schema, glyph)[3]
+    return combine([bases, aggs])
+
+
+def _dask_aggregate(names, arrays, schema, canvas, glyph, summary,
+                    x_range, y_range):
+    create, info, append, combine, _ = \
+        compile_components(summary, schema, glyph)
+    extend = glyph._build_extend(canvas.x_axis.mapper, canvas.y_axis.mapper,
+                                 info, append)
+
+    width = canvas.plot_width
+    height = canvas.plot_height
+    x_st = canvas.x_axis.compute_scale_and_translate(x_range, width)
+    y_st = canvas.y_axis.compute_scale_and_translate(y_range, height)
+    vt = x_st + y_st
+    bounds = tuple(float(b) for b in x_range + y_range)
+    shape = (height, width)
+
+    def chunk(*blocks):
+        aggs = create(shape)
+        extend(aggs, _columns(names, blocks), vt, bounds)
+        return aggs
+
+    name = tokenize(*(arrays + [canvas, glyph, summary, x_range, y_range]))
+    return _compute_blocks(arrays, chunk, combine, name)
+
+
+def _compute_blocks(arrays, chunk, combine, name):
+    """Apply ``chunk`` to the aligned blocks of ``arrays`` (at least one of
+    which is dask-backed), and ``combine`` the results in a tree of tasks
+    like those of dask DataFrames."""
+    # Give every array the chunks of the first dask-backed one, so that their
+    # blocks line up. NumPy (broadcast) arrays are sliced lazily in the graph.
+    chunks = next(a for a in arrays if isinstance(a, da.Array)).chunks
+    arrays = [a.rechunk(chunks) if isinstance(a, da.Array) else
+              da.from_array(a, chunks=chunks, name=False) for a in arrays]
+
+    keys = [list(flatten(a.__dask_keys__())) for a in arrays]
+    keys2 = [(name, i) for i in range(len(keys[0]))]
+    dsk = dict((k2, (chunk,) + block_keys)
+               for (k2, block_keys) in zip(keys2, zip(*keys)))
+    tree_combine(dsk, name, combine)
+
+    graph = merge(*[a.__dask_graph__() for a in arrays])
+    all_keys = [k for ks in keys for k in ks]
+    dsk.update(da.Array.__dask_optimize__(graph, all_keys))
+
+    scheduler = dask.base.get_scheduler() or da.Array.__dask_scheduler__
+    return scheduler(dsk, name)